@@ -0,0 +1,76 @@
+"""
+Request deadlines for API routes
+
+`run_request` sets the deadline (see app.core.deadline) for an API request,
+from its `X-Request-Timeout` header (seconds) or a per-route default. It
+also cancels the work if the client disconnects.
+"""
+
+import asyncio
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, deadline, deadline_scope
+from app.core.logger import init_logger
+
+logger = init_logger(__name__)
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+def request_timeout(request: Request, default):
+    """Timeout asked for in the request header, capped at REQUEST_TIMEOUT_MAX"""
+    header = request.headers.get(TIMEOUT_HEADER)
+    if header is None:
+        return default
+    try:
+        seconds = float(header)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {TIMEOUT_HEADER}: {header!r}")
+        return default
+    if not seconds > 0:  # also rejects NaN
+        return default
+    return min(seconds, settings.REQUEST_TIMEOUT_MAX)
+
+
+async def _wait_for_disconnect(request: Request):
+    # Handlers have read their body by now; anything else left is skipped
+    # until the server reports the disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_request(request: Request, work, default_timeout):
+    """
+    Await `work` (a coroutine) under the request deadline
+
+    The work is cancelled when the deadline passes (504) or the client goes
+    away (499, which nobody receives), so abandoned requests stop calling
+    Reddit and Gemini.
+    """
+    with deadline(request_timeout(request, default_timeout)):
+        task = asyncio.create_task(work)  # inherits the deadline
+        watcher = asyncio.create_task(_wait_for_disconnect(request))
+        try:
+            async with deadline_scope():
+                done, _ = await asyncio.wait(
+                    {task, watcher}, return_when=asyncio.FIRST_COMPLETED
+                )
+        except DeadlineExceeded:
+            logger.warning(f"Deadline exceeded for {request.url.path}; cancelling")
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+        finally:
+            for pending in (task, watcher):
+                pending.cancel()
+            await asyncio.gather(task, watcher, return_exceptions=True)
+
+        if task not in done:
+            logger.info(f"Client disconnected from {request.url.path}; cancelled")
+            raise HTTPException(status_code=499, detail="Client closed request")
+        try:
+            return task.result()
+        except DeadlineExceeded:
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
@@ -0,0 +1,131 @@
+"""
+HTTP caching for read endpoints
+
+Responses carry a weak ETag (a hash of the encoded body) and a
+`Cache-Control: max-age`. The encoded body of each resource is kept for
+max-age seconds, so while it is fresh a conditional GET whose If-None-Match
+matches is answered with 304 without calling Reddit or re-encoding anything.
+The cache is shared by all uvicorn workers on the host (see cache_backends).
+"""
+
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.core.cache_backends import create_cache_backend
+
+try:
+    import orjson
+except ImportError:  # comes with LangChain on CPython; stdlib json otherwise
+    orjson = None
+
+# key -> packed (etag, extra headers, encoded body); shared by all workers
+# unless CACHE_BACKEND=memory. Created on first use, not at import.
+response_cache = None
+
+
+def get_response_cache():
+    global response_cache
+    if response_cache is None:
+        response_cache = create_cache_backend()
+    return response_cache
+
+
+async def close_response_cache():
+    global response_cache
+    if response_cache is not None:
+        await response_cache.close()
+        response_cache = None
+
+
+def _orjson_default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+
+def encode_json(payload):
+    """
+    Encode a response payload as compact UTF-8 JSON
+
+    Uses orjson when installed; plain dicts and lists are then encoded
+    natively and only models and exotic types go through a fallback.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_orjson_default)
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def pack_entry(etag, body, extra_headers):
+    return json.dumps([etag, extra_headers]).encode("utf-8") + b"\n" + body
+
+
+def unpack_entry(blob):
+    meta, body = blob.split(b"\n", 1)
+    etag, extra_headers = json.loads(meta)
+    return etag, body, extra_headers
+
+
+def compute_etag(body):
+    # Weak: GZipMiddleware may send the same tag with a gzip-coded body, and
+    # a strong validator would have to differ between content-codings
+    return f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(request, etag):
+    """Evaluate If-None-Match (weak comparison, as RFC 9110 requires for it)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def _cache_headers(etag, max_age):
+    return {"ETag": etag, "Cache-Control": f"max-age={max_age}"}
+
+
+async def cached_json_response(request: Request, key, max_age, build, headers=None):
+    """
+    Serve a JSON resource with ETag/Cache-Control and conditional GET support
+
+    Args:
+        request (Request): Incoming request (for If-None-Match)
+        key (str): Cache key identifying the resource
+        max_age (int): Seconds clients and this server may reuse the body
+        build (callable): Coroutine function producing the payload on a miss
+        headers (callable): Optional function of the payload returning extra
+            response headers; they are cached along with the body
+    """
+    cache = get_response_cache()
+    cached = await cache.get(key)
+    if cached is None:
+        # One worker on the host builds a missing entry; the rest wait for it
+        async with cache.lock(key):
+            cached = await cache.get(key)
+            if cached is None:
+                payload = await build()
+                body = encode_json(payload)
+                etag = compute_etag(body)
+                extra_headers = headers(payload) if headers else {}
+                await cache.set(key, pack_entry(etag, body, extra_headers), max_age)
+
+    if cached is not None:
+        etag, body, extra_headers = unpack_entry(cached)
+
+    response_headers = {**_cache_headers(etag, max_age), **extra_headers}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(
+        content=body, media_type="application/json", headers=response_headers
+    )
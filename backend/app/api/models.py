@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -30,6 +30,19 @@ class PostDetails(BaseModel):
     comments: List[Comment]
 
 
+class PartialPostDetails(BaseModel):
+    """PostDetails limited to the fields selected with `fields`"""
+
+    id: Optional[str] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    url: Optional[str] = None
+    score: Optional[int] = None
+    num_comments: Optional[int] = None
+    subreddit: Optional[str] = None
+    comments: Optional[List[Comment]] = None
+
+
 class GenerateCommentRequest(BaseModel):
     post_id: str
     tone: str = "auto"
@@ -41,12 +54,14 @@ class GenerateCommentResponse(BaseModel):
     length: Optional[int] = None
     tone: str
     error: Optional[str] = None
+    generation_id: Optional[int] = None
 
 
 class PostCommentRequest(BaseModel):
     post_id: str
     comment_text: str
     dry_run: bool = True
+    generation_id: Optional[int] = None
 
 
 class PostCommentResponse(BaseModel):
@@ -56,3 +71,38 @@ class PostCommentResponse(BaseModel):
     message: Optional[str] = None
     error: Optional[str] = None
     error_type: Optional[str] = None
+
+
+class ProfilingConfig(BaseModel):
+    enabled: bool
+    sample_rate: Optional[float] = None
+
+
+class ProfilingStatus(BaseModel):
+    enabled: bool
+    sample_rate: float
+    profiles: List[str]
+
+
+class LoopMonitorStatus(BaseModel):
+    enabled: bool
+    interval_ms: float
+    threshold_ms: float
+    lag: Dict[str, Any]
+    blocked_total: int
+    recent_blocks: List[Dict[str, Any]]
+
+
+class GenerationRecord(BaseModel):
+    id: int
+    created_at: float
+    post_id: str
+    subreddit: Optional[str] = None
+    tone: str
+    model: Optional[str] = None
+    prompt_hash: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    latency_ms: Optional[float] = None
+    posted: bool
+    text: str
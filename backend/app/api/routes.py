@@ -1,19 +1,39 @@
+import asyncio
+import sqlite3
 from typing import List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+from app.api.deadlines import run_request
+from app.api.http_cache import cached_json_response, encode_json
 from app.api.models import (
-    Comment,
     GenerateCommentRequest,
     GenerateCommentResponse,
+    GenerationRecord,
+    LoopMonitorStatus,
+    PartialPostDetails,
     PostCommentRequest,
     PostCommentResponse,
     PostDetails,
     PostSummary,
+    ProfilingConfig,
+    ProfilingStatus,
+)
+from app.core import profiling
+from app.core.config import settings
+from app.core.constants import (
+    DEFAULT_COMMENT_LIMIT,
+    DEFAULT_POST_LIMIT,
+    MAX_COMMENT_OFFSET,
+    MAX_COMMENT_PAGE_SIZE,
+    MAX_POST_PAGE_SIZE,
 )
-from app.core.constants import DEFAULT_COMMENT_LIMIT, DEFAULT_POST_LIMIT
 from app.core.logger import init_logger
+from app.core.loop_monitor import loop_monitor
 from app.services.async_reddit_client import AsyncRedditClient
+from app.services.health import HealthMonitor
+from app.services.listing_poller import ListingHub
 from app.services.llm_client import LLMClient
 
 logger = init_logger(__name__)
@@ -38,17 +58,64 @@ async def get_llm_client():
     return llm_client
 
 
+async def close_clients():
+    """Close the shared clients (at shutdown)"""
+    global reddit_client, llm_client
+    if reddit_client:
+        await reddit_client.close()
+        reddit_client = None
+    if llm_client:
+        llm_client.close()
+        llm_client = None
+
+
+# One shared upstream poller per subreddit with live subscribers
+listing_hub = ListingHub(get_reddit_client)
+
+
+async def probe_reddit():
+    await (await get_reddit_client()).ping()
+
+
+async def probe_llm():
+    await (await get_llm_client()).ping()
+
+
+# Upstream status behind /readyz, refreshed in the background (see main.py)
+health_monitor = HealthMonitor({"reddit": probe_reddit, "llm": probe_llm})
+
+
 @router.get("/")
 async def root():
     return {"message": "Reddit Auto Commenter API"}
 
 
+def next_page_headers(request, post_summaries, limit):
+    """X-Next-Cursor/Link headers pointing at the page after this one"""
+    if len(post_summaries) < limit:
+        return {}  # last page
+    cursor = f"t3_{post_summaries[-1].id}"
+    next_url = request.url.include_query_params(after=cursor)
+    return {"X-Next-Cursor": cursor, "Link": f'<{next_url}>; rel="next"'}
+
+
 @router.get("/posts/{subreddit}", response_model=List[PostSummary])
-async def get_posts(subreddit: str, limit: int = DEFAULT_POST_LIMIT):
-    """Fetch top posts from a subreddit"""
-    try:
+async def get_posts(
+    request: Request,
+    subreddit: str,
+    limit: int = Query(DEFAULT_POST_LIMIT, ge=1, le=MAX_POST_PAGE_SIZE),
+    after: str | None = Query(None, pattern=r"^t3_[a-z0-9]+$"),
+):
+    """
+    Fetch top posts from a subreddit
+
+    Paginate by passing the X-Next-Cursor header of a page as `after`; each
+    page is a single upstream request and is cached per cursor.
+    """
+
+    async def build():
         reddit_client = await get_reddit_client()
-        posts = await reddit_client.get_top_posts(subreddit, limit=limit)
+        posts = await reddit_client.get_top_posts(subreddit, limit=limit, after=after)
         if not posts:
             raise HTTPException(
                 status_code=404, detail="No posts found or subreddit not accessible"
@@ -69,75 +136,188 @@ async def get_posts(subreddit: str, limit: int = DEFAULT_POST_LIMIT):
 
         return post_summaries
 
+    try:
+        return await run_request(
+            request,
+            cached_json_response(
+                request,
+                f"posts:{subreddit.lower()}:{limit}:{after}",
+                settings.CACHE_MAX_AGE_POSTS,
+                build,
+                headers=lambda summaries: next_page_headers(request, summaries, limit),
+            ),
+            settings.REQUEST_TIMEOUT,
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching posts from r/{subreddit}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/post/{post_id}", response_model=PostDetails)
-async def get_post_details(post_id: str):
-    """Fetch detailed post information with comments"""
-    try:
-        reddit_client = await get_reddit_client()
-        post = await reddit_client.get_submission_by_id(post_id)
-        post_data = await reddit_client.get_post_data(post)
-        comments_data = await reddit_client.get_top_comments(
-            post, limit=DEFAULT_COMMENT_LIMIT
+@router.get("/posts/{subreddit}/stream")
+async def stream_posts(subreddit: str):
+    """
+    Live listing updates as Server-Sent Events
+
+    The first event is a `snapshot` of the listing; after that only `diff`
+    events (added posts, score/comment-count updates, removed ids) are sent.
+    """
+
+    async def events():
+        async with listing_hub.subscribe(subreddit) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.LIVE_KEEPALIVE
+                    )
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                data = encode_json(event).decode("utf-8")
+                yield f"event: {event['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+POST_DETAIL_FIELDS = tuple(PostDetails.model_fields)
+
+
+def parse_fields(fields):
+    """Validated, ordered field names from a `fields=a,b` parameter"""
+    if not fields:
+        return POST_DETAIL_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(POST_DETAIL_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
         )
-
-        # Convert to response model
-        comments = [
-            Comment(
-                id=comment["id"],
-                body=comment["body"],
-                score=comment["score"],
-                author=comment["author"],
-                created_utc=comment["created_utc"],
+    return tuple(field for field in POST_DETAIL_FIELDS if field in requested)
+
+
+def truncate_text(text, max_length):
+    if max_length is None or len(text) <= max_length:
+        return text
+    return text[:max_length] + "…"
+
+
+@router.get("/post/{post_id}", response_model=PartialPostDetails)
+async def get_post_details(
+    request: Request,
+    post_id: str,
+    fields: str | None = Query(None, description="Comma-separated fields to return"),
+    comment_limit: int = Query(DEFAULT_COMMENT_LIMIT, ge=1, le=MAX_COMMENT_PAGE_SIZE),
+    comment_offset: int = Query(0, ge=0, le=MAX_COMMENT_OFFSET),
+    max_body_length: int | None = Query(
+        None, ge=1, description="Truncate content and comment bodies"
+    ),
+):
+    """
+    Fetch detailed post information with comments
+
+    `fields` selects top-level fields, `comment_limit`/`comment_offset` page
+    through the top comments (X-Next-Comment-Offset points at the next page)
+    and `max_body_length` truncates the post content and comment bodies.
+    Without `comments` in `fields` the comments are not fetched at all.
+    """
+    selected = parse_fields(fields)
+    with_comments = "comments" in selected
+    page_end = comment_offset + comment_limit
+    has_next_page = False
+
+    async def build():
+        nonlocal has_next_page
+        reddit_client = await get_reddit_client()
+        if with_comments:
+            # The first page of top comments comes with the submission, so
+            # paging reads a prefix of the same (snapshot-cached) list; one
+            # extra comment tells whether another page follows
+            post_data = await reddit_client.get_post_with_comments_by_id(
+                post_id, comment_limit=page_end + 1
             )
-            for comment in comments_data
-        ]
-
-        return PostDetails(
-            id=post_data["id"],
-            title=post_data["title"],
-            content=post_data["content"],
-            url=post_data["url"],
-            score=post_data["score"],
-            num_comments=post_data["num_comments"],
-            subreddit=post_data["subreddit"],
-            comments=comments,
+            has_next_page = len(post_data["comments"]) > page_end
+        else:
+            post_data = await reddit_client.get_post_data_by_id(post_id)
+
+        # Plain dicts: the response is encoded directly, without a model pass
+        payload = {field: post_data[field] for field in selected if field != "comments"}
+        if "content" in payload:
+            payload["content"] = truncate_text(payload["content"], max_body_length)
+        if with_comments:
+            page = post_data["comments"][comment_offset:page_end]
+            payload["comments"] = [
+                {**comment, "body": truncate_text(comment["body"], max_body_length)}
+                for comment in page
+            ]
+        return payload
+
+    def headers(payload):
+        if has_next_page:
+            return {"X-Next-Comment-Offset": str(page_end)}
+        return {}
+
+    try:
+        return await run_request(
+            request,
+            cached_json_response(
+                request,
+                f"post:{post_id}:{','.join(selected)}:{comment_limit}:{comment_offset}"
+                f":{max_body_length}",
+                settings.CACHE_MAX_AGE_POST,
+                build,
+                headers=headers,
+            ),
+            settings.REQUEST_TIMEOUT,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching post details for {post_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/tones", response_model=List[str])
-async def get_available_tones():
+async def get_available_tones(request: Request):
     """Get available comment tones"""
-    try:
+
+    async def build():
         llm_client = await get_llm_client()
-        tones = llm_client.get_available_tones()
-        return tones
+        return llm_client.get_available_tones()
+
+    try:
+        return await cached_json_response(
+            request, "tones", settings.CACHE_MAX_AGE_TONES, build
+        )
     except Exception as e:
         logger.error(f"Error fetching tones: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/generate-comment", response_model=GenerateCommentResponse)
-async def generate_comment(request: GenerateCommentRequest):
-    """Generate a comment for a post with specified tone"""
-    try:
+async def generate_comment(request: GenerateCommentRequest, http_request: Request):
+    """
+    Generate a comment for a post with specified tone
+
+    Bound by GENERATE_TIMEOUT (or X-Request-Timeout) and cancelled, Gemini
+    call included, if the client disconnects.
+    """
+
+    async def generate():
         reddit_client = await get_reddit_client()
         llm_client = await get_llm_client()
 
         # Get post data
-        post = await reddit_client.get_submission_by_id(request.post_id)
-        post_data = await reddit_client.get_post_data(post)
-        comments_data = await reddit_client.get_top_comments(
-            post, limit=DEFAULT_COMMENT_LIMIT
+        post_data = await reddit_client.get_post_with_comments_by_id(
+            request.post_id, comment_limit=DEFAULT_COMMENT_LIMIT
         )
+        comments_data = post_data["comments"]
 
         # Check if post is suitable
         relevance = llm_client.analyze_post_relevance(post_data)
@@ -149,7 +329,7 @@ async def generate_comment(request: GenerateCommentRequest):
             )
 
         # Generate comment
-        result = llm_client.generate_comment(
+        result = await llm_client.generate_comment(
             post_data, comments_data, tone=request.tone
         )
 
@@ -159,8 +339,14 @@ async def generate_comment(request: GenerateCommentRequest):
             length=result.get("length"),
             tone=result["tone"],
             error=result.get("error"),
+            generation_id=result.get("generation_id"),
         )
 
+    try:
+        return await run_request(http_request, generate(), settings.GENERATE_TIMEOUT)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating comment: {e}")
         return GenerateCommentResponse(success=False, tone=request.tone, error=str(e))
@@ -174,6 +360,8 @@ async def post_comment(request: PostCommentRequest):
         result = await reddit_client.post_comment(
             request.post_id, request.comment_text, dry_run=request.dry_run
         )
+        if result["success"] and not request.dry_run:
+            await mark_generation_posted(request)
 
         return PostCommentResponse(
             success=result["success"],
@@ -191,9 +379,92 @@ async def post_comment(request: PostCommentRequest):
         )
 
 
+async def mark_generation_posted(request: PostCommentRequest):
+    """Flag the posted comment in the generation history"""
+    try:
+        llm_client = await get_llm_client()
+        if request.generation_id is not None:
+            marked = await asyncio.to_thread(
+                llm_client.generations.mark_posted, request.generation_id
+            )
+        else:
+            marked = await asyncio.to_thread(
+                llm_client.generations.mark_posted,
+                post_id=request.post_id,
+                text=request.comment_text,
+            )
+        if not marked:
+            logger.info(f"Posted comment on {request.post_id} has no stored generation")
+    except Exception as e:
+        logger.error(f"Failed to mark generation posted for {request.post_id}: {e}")
+
+
+@router.get("/generations", response_model=List[GenerationRecord])
+async def list_generations(
+    response: Response,
+    q: str | None = Query(None, description="Full-text search (FTS5 syntax)"),
+    post_id: str | None = None,
+    subreddit: str | None = None,
+    tone: str | None = None,
+    model: str | None = None,
+    posted: bool | None = None,
+    since: float | None = Query(None, description="Unix time, inclusive"),
+    until: float | None = Query(None, description="Unix time, exclusive"),
+    limit: int = Query(50, ge=1, le=200),
+    before: int | None = Query(None, ge=1, description="X-Next-Cursor of a page"),
+):
+    """
+    Search the history of generated comments, newest first
+
+    Paginate by passing the X-Next-Cursor header of a page as `before`.
+    """
+    llm_client = await get_llm_client()
+    try:
+        rows, next_cursor = await asyncio.to_thread(
+            llm_client.generations.query,
+            search=q,
+            before_id=before,
+            limit=limit,
+            post_id=post_id,
+            subreddit=subreddit,
+            tone=tone,
+            model=model,
+            posted=posted,
+            since=since,
+            until=until,
+        )
+    except sqlite3.OperationalError as e:
+        # Malformed FTS query
+        raise HTTPException(status_code=400, detail=f"Invalid search: {e}")
+
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return rows
+
+
+@router.get("/livez")
+async def liveness():
+    """Liveness: the process serves requests; depends on nothing external"""
+    return {"status": "alive"}
+
+
+@router.get("/readyz")
+async def readiness(response: Response):
+    """
+    Readiness from the last background probes of Reddit and Gemini
+
+    Never calls upstream itself; 503 until every probe has passed recently.
+    """
+    status = health_monitor.status()
+    if status["status"] != "ready":
+        response.status_code = 503
+    response.headers["Cache-Control"] = "no-store"
+    return status
+
+
 @router.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (prefer /livez and /readyz)"""
     try:
         reddit_client = await get_reddit_client()
         return {
@@ -207,3 +478,39 @@ async def health_check():
             "error": str(e),
             "can_post": False,
         }
+
+
+def require_debug_token(token):
+    if not profiling.is_valid_debug_token(token):
+        raise HTTPException(status_code=403, detail="Invalid or missing debug token")
+
+
+@router.get("/debug/profiling", response_model=ProfilingStatus)
+async def get_profiling_status(x_debug_token: str | None = Header(default=None)):
+    """Show profiling state and the stored profile dumps"""
+    require_debug_token(x_debug_token)
+    return ProfilingStatus(
+        **profiling.state.as_dict(), profiles=profiling.list_profiles()
+    )
+
+
+@router.post("/debug/profiling", response_model=ProfilingStatus)
+async def configure_profiling(
+    request: ProfilingConfig, x_debug_token: str | None = Header(default=None)
+):
+    """Turn sampled request profiling on or off"""
+    require_debug_token(x_debug_token)
+    profiling.state.enabled = request.enabled
+    if request.sample_rate is not None:
+        profiling.state.sample_rate = min(max(request.sample_rate, 0.0), 1.0)
+    logger.info(f"Profiling updated: {profiling.state.as_dict()}")
+    return ProfilingStatus(
+        **profiling.state.as_dict(), profiles=profiling.list_profiles()
+    )
+
+
+@router.get("/debug/loop", response_model=LoopMonitorStatus)
+async def get_loop_status(x_debug_token: str | None = Header(default=None)):
+    """Event-loop lag histogram and recent blocked-loop stacks"""
+    require_debug_token(x_debug_token)
+    return LoopMonitorStatus(**loop_monitor.status())
@@ -0,0 +1,289 @@
+"""
+Response cache backends shared between uvicorn workers
+
+Values are bytes with a TTL per key. Besides get/set, every backend offers
+`lock(key)`, a lock held across processes (for SQLite and Redis) so that
+only one worker on the host rebuilds a missing entry while the others wait
+for it:
+
+- memory: per-process LRU (TTLCache); the lock only covers this process
+- sqlite: a WAL database file every worker on the host opens (default)
+- redis: any Redis-compatible server; needs the optional `redis` package
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import init_logger
+from app.core.startup import lazy_import
+
+logger = init_logger(__name__)
+
+LOCK_POLL_INTERVAL = 0.05  # seconds between attempts to take a held lock
+
+
+class CacheBackend:
+    """Interface of the shared response cache"""
+
+    async def get(self, key):
+        """Cached bytes, or None if missing or expired"""
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    async def delete(self, key):
+        raise NotImplementedError
+
+    async def _try_lock(self, key, token, lease):
+        """Take the lock of `key` unless another holder's lease is still valid"""
+        raise NotImplementedError
+
+    async def _unlock(self, key, token):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def lock(self, key, lease=None):
+        """
+        Hold the cross-process lock of `key`
+
+        The lock expires after `lease` seconds (CACHE_LOCK_LEASE) in case its
+        holder dies; a waiter that gives up after that long proceeds without
+        it rather than failing the request.
+        """
+        lease = lease or settings.CACHE_LOCK_LEASE
+        token = uuid.uuid4().hex
+        give_up_at = time.monotonic() + lease
+        acquired = await self._try_lock(key, token, lease)
+        while not acquired and time.monotonic() < give_up_at:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            acquired = await self._try_lock(key, token, lease)
+        if not acquired:
+            logger.warning(f"Gave up waiting for cache lock {key}")
+        try:
+            yield
+        finally:
+            if acquired:
+                await self._unlock(key, token)
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, maxsize=2048):
+        self._cache = TTLCache(maxsize=maxsize)
+        self._locks = {}  # key -> (holder token, lease expiry)
+
+    async def get(self, key):
+        return self._cache.get(key)
+
+    async def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key):
+        self._cache.delete(key)
+
+    async def _try_lock(self, key, token, lease):
+        holder = self._locks.get(key)
+        if holder is not None and holder[1] > time.monotonic():
+            return False
+        self._locks[key] = (token, time.monotonic() + lease)
+        return True
+
+    async def _unlock(self, key, token):
+        holder = self._locks.get(key)
+        if holder is not None and holder[0] == token:
+            del self._locks[key]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key        TEXT PRIMARY KEY,
+    value      BLOB NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at);
+
+CREATE TABLE IF NOT EXISTS cache_locks (
+    key        TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+PURGE_EVERY = 500  # sets between sweeps of expired rows
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache in a SQLite file shared by all workers on the host
+
+    Expiry uses wall-clock time, as it must agree between processes. The
+    database is opened on first use, and every statement runs in a worker
+    thread: waiting out another worker's write lock (busy_timeout) must not
+    stall the event loop.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.CACHE_DB_PATH
+        self._lock = threading.Lock()
+        self._sets = 0
+        self._conn = None
+
+    def _connection(self):
+        """Open the database on first use (call with self._lock held)"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key):
+        with self._lock:
+            cursor = self._connection().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl),
+            )
+            self._sets += 1
+            if self._sets % PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def _delete(self, key):
+        with self._lock:
+            self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _lock_row(self, key, token, lease):
+        now = time.time()
+        with self._lock:
+            # Takes a free or expired lock in one atomic statement
+            cursor = self._connection().execute(
+                """
+                INSERT INTO cache_locks (key, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    owner = excluded.owner,
+                    expires_at = excluded.expires_at
+                WHERE cache_locks.expires_at <= ?
+                """,
+                (key, token, now + lease, now),
+            )
+        return cursor.rowcount == 1
+
+    def _unlock_row(self, key, token):
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, token)
+            )
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def get(self, key):
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key, value, ttl):
+        if ttl > 0:
+            await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key):
+        await asyncio.to_thread(self._delete, key)
+
+    async def _try_lock(self, key, token, lease):
+        return await asyncio.to_thread(self._lock_row, key, token, lease)
+
+    async def _unlock(self, key, token):
+        await asyncio.to_thread(self._unlock_row, key, token)
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+
+# Deletes the lock only if this holder still owns it
+REDIS_UNLOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache in a Redis-compatible server (Redis, Valkey, KeyDB, ...)"""
+
+    def __init__(self, url=None, prefix="auto-commenter:"):
+        try:
+            redis = lazy_import("redis.asyncio")
+        except ImportError as e:
+            raise ValueError(
+                "CACHE_BACKEND=redis requires the redis package (uv add redis)"
+            ) from e
+        self.prefix = prefix
+        self._redis = redis.from_url(url or settings.CACHE_REDIS_URL)
+        self._unlock_script = self._redis.register_script(REDIS_UNLOCK)
+
+    async def get(self, key):
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        await self._redis.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def delete(self, key):
+        await self._redis.delete(self.prefix + key)
+
+    async def _try_lock(self, key, token, lease):
+        lock_key = f"{self.prefix}lock:{key}"
+        return bool(
+            await self._redis.set(lock_key, token, nx=True, px=int(lease * 1000))
+        )
+
+    async def _unlock(self, key, token):
+        await self._unlock_script(keys=[f"{self.prefix}lock:{key}"], args=[token])
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+BACKENDS = {
+    "memory": MemoryCacheBackend,
+    "sqlite": SQLiteCacheBackend,
+    "redis": RedisCacheBackend,
+}
+
+
+def create_cache_backend(name=None):
+    """Backend selected by CACHE_BACKEND"""
+    name = (name or settings.CACHE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown CACHE_BACKEND '{name}' (expected one of {', '.join(BACKENDS)})"
+        )
+    return BACKENDS[name]()
@@ -1,19 +1,132 @@
 from decouple import config  # type: ignore
 
 
+class lazy_config:
+    """
+    Settings attribute read from the environment on first access
+
+    Takes the same arguments as decouple's `config`. Deferring the lookup keeps
+    importing modules cheap and lets entry points that never touch a required
+    credential run without it.
+    """
+
+    def __init__(self, name, **kwargs):
+        self.name = name
+        self.kwargs = kwargs
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = config(self.name, **self.kwargs)
+        instance.__dict__[self.attr] = value  # cache: later reads skip the descriptor
+        return value
+
+
 class Settings:
     # Reddit API
-    REDDIT_CLIENT_ID = config("REDDIT_CLIENT_ID")
-    REDDIT_CLIENT_SECRET = config("REDDIT_CLIENT_SECRET")
-    USER_AGENT = config("USER_AGENT", default="AutoCommenter/1.0")
+    REDDIT_CLIENT_ID = lazy_config("REDDIT_CLIENT_ID")
+    REDDIT_CLIENT_SECRET = lazy_config("REDDIT_CLIENT_SECRET")
+    USER_AGENT = lazy_config("USER_AGENT", default="AutoCommenter/1.0")
+    # API hosts; only changed to reach local stand-ins (soak test)
+    REDDIT_OAUTH_URL = lazy_config(
+        "REDDIT_OAUTH_URL", default="https://oauth.reddit.com"
+    )
+    REDDIT_URL = lazy_config("REDDIT_URL", default="https://www.reddit.com")
 
     # Reddit Authentication (for posting)
-    REDDIT_USERNAME = config("REDDIT_USERNAME")
-    REDDIT_PASSWORD = config("REDDIT_PASSWORD")
+    REDDIT_USERNAME = lazy_config("REDDIT_USERNAME")
+    REDDIT_PASSWORD = lazy_config("REDDIT_PASSWORD")
 
     # Future: Gemini API
-    GEMINI_API_KEY = config("GEMINI_API_KEY")
-    GEMINI_MODEL = config("GEMINI_MODEL", default="gemini-2.0-flash")
+    GEMINI_API_KEY = lazy_config("GEMINI_API_KEY")
+    GEMINI_MODEL = lazy_config("GEMINI_MODEL", default="gemini-2.0-flash")
+    GEMINI_BASE_URL = lazy_config(
+        "GEMINI_BASE_URL", default="https://generativelanguage.googleapis.com"
+    )
+
+    # Logging
+    LOG_LEVEL = lazy_config("LOG_LEVEL", default="INFO")
+    LOG_FORMAT = lazy_config("LOG_FORMAT", default="json")  # "json" or "text"
+    LOG_MAX_FIELD_LENGTH = lazy_config("LOG_MAX_FIELD_LENGTH", default=1000, cast=int)
+    LOG_SAMPLE_RATE = lazy_config("LOG_SAMPLE_RATE", default=1.0, cast=float)
+
+    # Tracing
+    TRACE_SAMPLE_RATE = lazy_config("TRACE_SAMPLE_RATE", default=0.0, cast=float)
+    TRACE_EXPORT_PATH = lazy_config("TRACE_EXPORT_PATH", default="data/traces.jsonl")
+    TRACE_SERVICE_NAME = lazy_config("TRACE_SERVICE_NAME", default="auto-commenter")
+
+    # Profiling / debug endpoints (disabled while DEBUG_TOKEN is empty)
+    DEBUG_TOKEN = lazy_config("DEBUG_TOKEN", default="")
+    PROFILE_ENABLED = lazy_config("PROFILE_ENABLED", default=False, cast=bool)
+    PROFILE_SAMPLE_RATE = lazy_config("PROFILE_SAMPLE_RATE", default=0.01, cast=float)
+    PROFILE_DIR = lazy_config("PROFILE_DIR", default="data/profiles")
+    PROFILE_MAX_BYTES = lazy_config("PROFILE_MAX_BYTES", default=100_000_000, cast=int)
+    # Event-loop lag histogram and blocked-loop stacks (GET /debug/loop)
+    LOOP_MONITOR_ENABLED = lazy_config("LOOP_MONITOR_ENABLED", default=False, cast=bool)
+    LOOP_MONITOR_INTERVAL = lazy_config(
+        "LOOP_MONITOR_INTERVAL", default=0.05, cast=float
+    )
+    LOOP_BLOCK_THRESHOLD = lazy_config("LOOP_BLOCK_THRESHOLD", default=0.1, cast=float)
+
+    # Local stores
+    PROCESSED_INDEX_PATH = lazy_config(
+        "PROCESSED_INDEX_PATH", default="data/processed_posts.sqlite3"
+    )
+    SNAPSHOT_DB_PATH = lazy_config("SNAPSHOT_DB_PATH", default="data/snapshots.sqlite3")
+    GENERATIONS_DB_PATH = lazy_config(
+        "GENERATIONS_DB_PATH", default="data/generations.sqlite3"
+    )
+    # Serve a stored post + comments for this long (seconds) ...
+    SNAPSHOT_MAX_AGE = lazy_config("SNAPSHOT_MAX_AGE", default=3600, cast=int)
+    # ... refreshing its score/num_comments once they are this old
+    SNAPSHOT_METRICS_MAX_AGE = lazy_config(
+        "SNAPSHOT_METRICS_MAX_AGE", default=300, cast=int
+    )
+
+    # HTTP caching (Cache-Control max-age, seconds) of read endpoints
+    CACHE_MAX_AGE_POSTS = lazy_config("CACHE_MAX_AGE_POSTS", default=60, cast=int)
+    CACHE_MAX_AGE_POST = lazy_config("CACHE_MAX_AGE_POST", default=30, cast=int)
+    CACHE_MAX_AGE_TONES = lazy_config("CACHE_MAX_AGE_TONES", default=86400, cast=int)
+    # Response cache shared by the uvicorn workers: memory, sqlite or redis
+    CACHE_BACKEND = lazy_config("CACHE_BACKEND", default="sqlite")
+    CACHE_DB_PATH = lazy_config("CACHE_DB_PATH", default="data/cache.sqlite3")
+    CACHE_REDIS_URL = lazy_config("CACHE_REDIS_URL", default="redis://localhost:6379/0")
+    # Longest a worker rebuilds an entry before others stop waiting for it
+    CACHE_LOCK_LEASE = lazy_config("CACHE_LOCK_LEASE", default=30, cast=float)
+
+    # API server (python main.py); reload only applies to a single worker
+    API_HOST = lazy_config("API_HOST", default="0.0.0.0")
+    API_PORT = lazy_config("API_PORT", default=8000, cast=int)
+    API_WORKERS = lazy_config("API_WORKERS", default=1, cast=int)
+    API_RELOAD = lazy_config("API_RELOAD", default=True, cast=bool)
+
+    # Request deadlines (seconds); clients may ask for less or more, up to
+    # the maximum, with an X-Request-Timeout header
+    REQUEST_TIMEOUT = lazy_config("REQUEST_TIMEOUT", default=20, cast=float)
+    GENERATE_TIMEOUT = lazy_config("GENERATE_TIMEOUT", default=60, cast=float)
+    REQUEST_TIMEOUT_MAX = lazy_config("REQUEST_TIMEOUT_MAX", default=120, cast=float)
+
+    # Upstream traffic recording: off, record (to FIXTURES_DIR) or replay
+    RECORD_MODE = lazy_config("RECORD_MODE", default="off")
+    FIXTURES_DIR = lazy_config("FIXTURES_DIR", default="data/fixtures")
+    # Multiplier of recorded latencies during replay (0 = no delay)
+    REPLAY_LATENCY_SCALE = lazy_config("REPLAY_LATENCY_SCALE", default=1.0, cast=float)
+
+    # Response compression (bytes; smaller bodies are sent as is)
+    GZIP_ENABLED = lazy_config("GZIP_ENABLED", default=True, cast=bool)
+    GZIP_MINIMUM_SIZE = lazy_config("GZIP_MINIMUM_SIZE", default=1000, cast=int)
+
+    # Background health probes behind /readyz (seconds)
+    HEALTH_PROBE_INTERVAL = lazy_config("HEALTH_PROBE_INTERVAL", default=60, cast=float)
+    HEALTH_PROBE_TIMEOUT = lazy_config("HEALTH_PROBE_TIMEOUT", default=10, cast=float)
+
+    # Live listing updates (SSE)
+    LIVE_POLL_INTERVAL = lazy_config("LIVE_POLL_INTERVAL", default=30, cast=float)
+    LIVE_LISTING_LIMIT = lazy_config("LIVE_LISTING_LIMIT", default=25, cast=int)
+    LIVE_KEEPALIVE = lazy_config("LIVE_KEEPALIVE", default=15, cast=float)
 
 
 settings = Settings()
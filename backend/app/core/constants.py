@@ -2,14 +2,20 @@
 
 # Reddit API Limits and Defaults
 DEFAULT_POST_LIMIT = 3
+MAX_POST_PAGE_SIZE = 100  # Reddit returns at most 100 items per listing request
 DEFAULT_COMMENT_LIMIT = 5
+MAX_COMMENT_PAGE_SIZE = 100
+MAX_COMMENT_OFFSET = 400  # only top-level comments of the first page are loaded
 MAX_COMMENT_LENGTH = 10000  # Reddit's actual limit
+PREFETCH_CONCURRENCY = 3  # posts whose comments the CLI fetches at once
+PROBE_SUBREDDIT = "announcements"  # small listing read by health probes
 
 # Application Behavior
 DEFAULT_DRY_RUN = True
 MIN_POST_SCORE = 5
 MIN_POST_COMMENTS = 3
 MIN_TITLE_LENGTH = 10
+MIN_LOADED_COMMENTS = 0  # comments a chosen post needs (0 = no check)
 
 # Comment Content Filters
 DELETED_CONTENT = ["[deleted]", "[removed]", ""]
@@ -18,4 +24,5 @@ LINK_POST_PLACEHOLDER = "[Link/Image Post]"
 # LLM Settings
 DEFAULT_TEMPERATURE = 0.7
 MAX_LLM_TOKENS = 1000
+GEMINI_API_VERSION = "v1beta"
 MIN_COMMENT_LENGTH = 10
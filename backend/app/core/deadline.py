@@ -0,0 +1,62 @@
+"""
+Request deadlines and cancellation
+
+A deadline is the monotonic time by which the current unit of work must be
+done. It lives in a context variable, so it follows a request through every
+client call (and into tasks it creates) without being passed around. Clients
+wrap upstream awaits in `deadline_scope()`, which refuses to start work once
+the deadline has passed and cancels it when the deadline hits.
+
+Stdlib only, as the cron entry point imports it through the clients; API
+requests get their deadline from app.api.deadlines.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+deadline_var: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline of the current request or run has passed"""
+
+
+def remaining():
+    """Seconds left before the current deadline, or None without one"""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds):
+    """Set a deadline `seconds` from now; an earlier enclosing one still wins"""
+    new_deadline = time.monotonic() + seconds
+    current = deadline_var.get()
+    if current is not None:
+        new_deadline = min(new_deadline, current)
+    token = deadline_var.set(new_deadline)
+    try:
+        yield
+    finally:
+        deadline_var.reset(token)
+
+
+@asynccontextmanager
+async def deadline_scope():
+    """Bound the enclosed awaits by the current deadline (if any)"""
+    left = remaining()
+    if left is None:
+        yield
+        return
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the call started")
+
+    try:
+        async with asyncio.timeout(left):
+            yield
+    except TimeoutError as e:
+        raise DeadlineExceeded(f"Deadline exceeded after {left:.1f}s") from e
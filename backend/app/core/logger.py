@@ -1,19 +1,153 @@
+"""
+Queue-based structured logging
+
+Records are handed to a background thread through a queue, so log I/O never
+blocks the event loop. Output is one JSON object per line.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
 
+from app.core.config import settings
+from app.core.tracing import current_span
+
+# Id of the request (or script run) currently being handled
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+
+
+def new_request_id():
+    """Generate a short id for a request or script run"""
+    return uuid.uuid4().hex[:16]
+
+
+def truncate(value, limit=None):
+    """Shorten long strings so one record can't flood the log"""
+    limit = settings.LOG_MAX_FIELD_LENGTH if limit is None else limit
+    if limit and isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... (+{len(value) - limit} chars)"
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable format for local development"""
+
+    def __init__(self):
+        super().__init__(
+            "[%(asctime)s] [%(name)s] [%(levelname)s] [%(request_id)s] - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
 
-def init_logger(name):
-    console_formatter = logging.Formatter(
-        "[%(asctime)s] [%(name)s] [%(levelname)s] - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
 
-    console_handler = logging.StreamHandler(sys.stderr)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(console_formatter)
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records below WARNING"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that captures request context in the calling thread"""
+
+    def prepare(self, record):
+        # Runs in the caller's thread: context variables and exception info
+        # have to be resolved here, before the record crosses the queue
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        span = current_span.get()
+        if span is not None:
+            record.trace_id = span.trace_id
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                setattr(record, key, truncate(value))
+        return record
+
+
+def configure_logging():
+    """Start the background log listener (safe to call more than once)"""
+    global _queue_handler, _listener
+    with _lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        if settings.LOG_FORMAT == "text":
+            stream_handler.setFormatter(TextFormatter())
+        else:
+            stream_handler.setFormatter(JSONFormatter())
+
+        log_queue = queue.SimpleQueue()  # unbounded: put() never blocks
+        _queue_handler = ContextQueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+
+        _listener = QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def init_logger(name):
+    handler = configure_logging()
 
     logger = logging.getLogger(name)
-    logger.addHandler(console_handler)
-    logger.setLevel(logging.INFO)
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    # Our handler is attached directly; don't emit again via the root logger
+    logger.propagate = False
 
     return logger
@@ -0,0 +1,190 @@
+"""
+Event-loop lag and blocking-call detection
+
+Opt-in (LOOP_MONITOR_ENABLED). A heartbeat task on the event loop wakes
+every LOOP_MONITOR_INTERVAL seconds and records how late it woke in a lag
+histogram. A watchdog thread checks the heartbeat: when the loop has not
+come back for LOOP_BLOCK_THRESHOLD seconds, something is running without
+awaiting, and the watchdog captures the loop thread's stack at that moment
+(sys._current_frames), so the blocking call shows up by name rather than as
+an unexplained latency spike. The watchdog polls every tenth of the
+threshold (or every interval, if shorter), so a block is caught once it
+lasts about 1.1x LOOP_BLOCK_THRESHOLD. Both are served by GET /debug/loop.
+"""
+
+import asyncio
+import bisect
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from app.core.config import settings
+from app.core.logger import init_logger
+
+logger = init_logger(__name__)
+
+# Upper bounds (ms) of the lag histogram buckets; the last one is open
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+RECENT_BLOCKS = 20  # blocked-loop reports kept for the debug endpoint
+STACK_LIMIT = 15  # innermost frames kept per report
+LOGGED_FRAMES = 4  # innermost frames in the log line (logs truncate fields)
+
+
+class LagHistogram:
+    def __init__(self, bounds=LAG_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, lag_ms):
+        self.counts[bisect.bisect_left(self.bounds, lag_ms)] += 1
+        self.count += 1
+        self.total_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(float(bound), round(self.max_ms, 1))
+        return self.max_ms
+
+    def as_dict(self):
+        buckets = {f"le_{bound}": n for bound, n in zip(self.bounds, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": buckets,
+        }
+
+
+class LoopMonitor:
+    """Heartbeat on the event loop plus a watchdog thread watching it"""
+
+    def __init__(self, interval=None, threshold=None):
+        self.interval = interval or settings.LOOP_MONITOR_INTERVAL
+        self.threshold = threshold or settings.LOOP_BLOCK_THRESHOLD
+        # Fine enough that a block just past the threshold is not missed
+        self.poll_interval = min(self.threshold / 10, self.interval)
+        self.histogram = LagHistogram()
+        self.blocks = deque(maxlen=RECENT_BLOCKS)
+        self.blocked_total = 0
+        self.task = None
+
+        self._lock = threading.Lock()  # blocks, shared with the watchdog
+        self._stopped = threading.Event()
+        self._watchdog = None
+        self._loop_thread_id = None
+        # Written by the heartbeat, read by the watchdog
+        self._beat_seq = 0
+        self._beat_due = 0.0
+        self._reported_seq = -1
+        self._open_block = None
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    def start(self):
+        if self.task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat_due = time.monotonic() + self.interval
+        self._stopped.clear()
+        self.task = asyncio.create_task(self._heartbeat(), name="loop monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop watchdog", daemon=True
+        )
+        self._watchdog.start()
+        logger.info(
+            f"Loop monitor started (interval {self.interval * 1000:.0f} ms, "
+            f"block threshold {self.threshold * 1000:.0f} ms)"
+        )
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self._stopped.set()
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        await asyncio.to_thread(self._watchdog.join)
+
+    async def _heartbeat(self):
+        while True:
+            due = time.monotonic() + self.interval
+            self._beat_due = due
+            self._beat_seq += 1
+            await asyncio.sleep(self.interval)
+
+            lag = max(0.0, time.monotonic() - due)
+            self.histogram.observe(lag * 1000)
+            if lag >= self.threshold:
+                self._close_block(lag)
+
+    def _close_block(self, lag):
+        """Record how long the block reported by the watchdog lasted"""
+        with self._lock:
+            block, self._open_block = self._open_block, None
+            if block is not None:
+                block["duration_ms"] = round(lag * 1000, 1)
+        if block is not None:
+            logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_interval):
+            seq, due = self._beat_seq, self._beat_due
+            overdue = time.monotonic() - due
+            if overdue >= self.threshold and seq != self._reported_seq:
+                self._reported_seq = seq
+                self._report(overdue)
+
+    def _report(self, overdue):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.format_stack(frame)[-STACK_LIMIT:]
+        del frame
+        block = {
+            "at": time.time(),
+            "blocked_for_ms": round(overdue * 1000, 1),  # when detected
+            "duration_ms": None,  # filled in once the loop is back
+            "stack": [line.rstrip() for line in stack],
+        }
+        with self._lock:
+            self.blocks.append(block)
+            self.blocked_total += 1
+            self._open_block = block
+        logger.warning(
+            f"Event loop blocked for {overdue * 1000:.0f} ms so far in:\n"
+            + "".join(stack[-LOGGED_FRAMES:])
+        )
+
+    def status(self):
+        with self._lock:
+            blocks = [dict(block) for block in self.blocks]
+        return {
+            "enabled": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag": self.histogram.as_dict(),
+            "blocked_total": self.blocked_total,
+            "recent_blocks": blocks[::-1],  # newest first
+        }
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,140 @@
+"""
+On-demand profiling for API requests and scripts
+
+Profiling is off unless enabled through settings, the /debug/profiling
+endpoint or an `X-Profile: <DEBUG_TOKEN>` request header. Dumps are cProfile
+files in PROFILE_DIR (open with `python -m pstats` or snakeviz); the directory
+is kept under PROFILE_MAX_BYTES by deleting the oldest dumps.
+"""
+
+import asyncio
+import cProfile
+import os
+import random
+import re
+import secrets
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.core.logger import init_logger, new_request_id, request_id_var
+
+logger = init_logger(__name__)
+
+
+class ProfilingState:
+    """Runtime switch, adjustable through the debug endpoint"""
+
+    def __init__(self):
+        self.enabled = settings.PROFILE_ENABLED
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.busy = False  # only one cProfile can be active per thread
+
+    def as_dict(self):
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate}
+
+
+state = ProfilingState()
+
+
+def is_valid_debug_token(token):
+    """Check a debug token; debug features are off when DEBUG_TOKEN is unset"""
+    if not settings.DEBUG_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token, settings.DEBUG_TOKEN)
+
+
+def _should_sample():
+    return state.enabled and random.random() < state.sample_rate
+
+
+def write_profile(profiler, name):
+    """Dump a profile to PROFILE_DIR and rotate old dumps"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-")[:80]
+    suffix = request_id_var.get() or new_request_id()
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{suffix}.prof"
+    path = os.path.join(settings.PROFILE_DIR, filename)
+    profiler.dump_stats(path)
+    rotate_profiles()
+    logger.info(f"Wrote profile {path}")
+    return path
+
+
+def rotate_profiles():
+    """Delete the oldest dumps until the directory fits PROFILE_MAX_BYTES"""
+    entries = []
+    with os.scandir(settings.PROFILE_DIR) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".prof"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= settings.PROFILE_MAX_BYTES:
+            break
+        os.remove(path)
+        total -= size
+
+
+def list_profiles():
+    """Existing dumps, newest first"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    names = [n for n in os.listdir(settings.PROFILE_DIR) if n.endswith(".prof")]
+    return sorted(names, reverse=True)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles sampled or explicitly requested requests
+
+    When profiling is disabled and no X-Profile header is sent, the request is
+    passed straight through after a single header scan. cProfile sees the whole
+    event loop thread, so other requests running concurrently show up in the
+    dump too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        state.busy = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            state.busy = False
+            name = f"{scope['method']} {scope['path']}"
+            await asyncio.to_thread(write_profile, profiler, name)
+
+    def _requested(self, scope):
+        if state.busy:
+            return False
+        for key, value in scope["headers"]:
+            if key == b"x-profile":
+                return is_valid_debug_token(value.decode("latin-1"))
+        return _should_sample()
+
+
+@contextmanager
+def profile_run(name, force=False):
+    """Profile a script run when forced (--profile) or enabled and sampled"""
+    if not (force or _should_sample()):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        write_profile(profiler, name)
@@ -0,0 +1,76 @@
+"""
+Startup timing for script entry points
+
+Heavy third-party packages are imported through `lazy_import`, which records
+how long each import took. Together with `mark()` phases this gives the
+breakdown printed by `--profile-startup`.
+"""
+
+import importlib
+import subprocess
+import sys
+import time
+
+_started = time.perf_counter()
+_imports = {}
+_marks = {}
+
+
+def lazy_import(module_name):
+    """Import a module on first use and record the import time"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _imports[module_name] = time.perf_counter() - start
+    return module
+
+
+def mark(label):
+    """Record the first time a startup phase is reached"""
+    _marks.setdefault(label, time.perf_counter() - _started)
+
+
+def eager_import_times(module_name, top=10):
+    """
+    Import time of `module_name` broken down by top-level package
+
+    Runs a fresh interpreter with `-X importtime`, so the numbers are for a
+    cold import and don't depend on what this process already loaded. Self
+    times are summed per package, so nested imports are not double counted.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+    )
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def report(module_name):
+    """Format the startup breakdown of the current process"""
+    lines = ["Startup profile:", f"- Eager imports of {module_name} (cold):"]
+    for package, seconds in eager_import_times(module_name):
+        lines.append(f"    {package:<28} {seconds * 1000:8.1f} ms")
+
+    lines.append("- Lazy imports (this run):")
+    for module, seconds in _imports.items():
+        lines.append(f"    {module:<28} {seconds * 1000:8.1f} ms")
+    if not _imports:
+        lines.append("    (none)")
+
+    lines.append("- Phases since startup module import:")
+    for label, seconds in _marks.items():
+        lines.append(f"    {label:<28} {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,190 @@
+"""
+Lightweight request tracing
+
+Spans nest through a context variable, so they follow a request across awaits
+and into any asyncio tasks it creates. Finished spans of sampled traces are
+written as Zipkin v2 JSON (one span per line) by a background thread.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.config import settings
+
+current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+_lock = threading.Lock()
+_export_handler = None
+
+
+def _new_id(bits=64):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "tags",
+        "sampled",
+        "timestamp_us",
+        "duration_us",
+        "_start",
+    )
+
+    def __init__(self, name, trace_id, parent_id=None, sampled=True, kind=None):
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.tags = {}
+        self.sampled = sampled
+        self.timestamp_us = time.time_ns() // 1000
+        self.duration_us = None
+        self._start = time.perf_counter()
+
+    def set_tag(self, key, value):
+        self.tags[key] = str(value)
+
+    def finish(self):
+        self.duration_us = max(int((time.perf_counter() - self._start) * 1e6), 1)
+
+    def to_zipkin(self):
+        data = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": self.timestamp_us,
+            "duration": self.duration_us,
+            "localEndpoint": {"serviceName": settings.TRACE_SERVICE_NAME},
+            "tags": self.tags,
+        }
+        if self.parent_id:
+            data["parentId"] = self.parent_id
+        if self.kind:
+            data["kind"] = self.kind
+        return data
+
+
+class _SpanFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.span.to_zipkin(), default=str)
+
+
+def _get_export_handler():
+    """Start the span writer thread on first use"""
+    global _export_handler
+    with _lock:
+        if _export_handler is None:
+            path = settings.TRACE_EXPORT_PATH
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            file_handler = logging.FileHandler(path, encoding="utf-8")
+            file_handler.setFormatter(_SpanFormatter())
+
+            span_queue = queue.SimpleQueue()
+            listener = QueueListener(span_queue, file_handler)
+            listener.start()
+            atexit.register(listener.stop)
+            _export_handler = QueueHandler(span_queue)
+        return _export_handler
+
+
+def export_span(span):
+    """Queue a finished span for the writer thread"""
+    record = logging.makeLogRecord({"span": span})
+    _get_export_handler().queue.put_nowait(record)
+
+
+def _run_span(span):
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_tag("error", repr(e))
+        raise
+    finally:
+        current_span.reset(token)
+        span.finish()
+        if span.sampled:
+            export_span(span)
+
+
+@contextmanager
+def start_trace(name, trace_id=None, sampled=None, kind="SERVER", **tags):
+    """
+    Open the root span of a trace
+
+    Args:
+        name (str): Span name, e.g. "GET /posts/python"
+        trace_id (str): Continue an upstream trace instead of starting one
+        sampled (bool): Force the sampling decision; None uses TRACE_SAMPLE_RATE
+    """
+    if sampled is None:
+        sampled = random.random() < settings.TRACE_SAMPLE_RATE
+    if not sampled:
+        # Unsampled traces are tracked only to keep child spans no-ops
+        token = current_span.set(None)
+        try:
+            yield None
+        finally:
+            current_span.reset(token)
+        return
+
+    root = Span(name, trace_id or _new_id(128), kind=kind)
+    for key, value in tags.items():
+        root.set_tag(key, value)
+    yield from _run_span(root)
+
+
+@contextmanager
+def span(name, **tags):
+    """Open a child span of the current span (no-op outside a sampled trace)"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent_id=parent.span_id)
+    for key, value in tags.items():
+        child.set_tag(key, value)
+    yield from _run_span(child)
+
+
+def traced(name=None):
+    """Decorator wrapping a sync or async function in a span"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
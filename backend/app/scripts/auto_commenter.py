@@ -6,15 +6,21 @@ Posts one AI-generated comment to Reddit on random sub-reddit
 import asyncio
 import random
 import sys
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from app.core import startup
 from app.core.constants import (
     DEFAULT_COMMENT_LIMIT,
     DEFAULT_POST_LIMIT,
 )
-from app.core.logger import init_logger
+from app.core.logger import init_logger, new_request_id, request_id_var
+from app.core.profiling import profile_run
+from app.core.tracing import span, start_trace
 from app.services.async_reddit_client import AsyncRedditClient
 from app.services.llm_client import LLMClient
+from app.services.post_filter import COMMENTS, FilterStats
 
 # Daily commenter configuration
 SUBREDDITS = ["AskReddit", "askmen", "YouShouldKnow", "programming", "todayilearned"]
@@ -23,6 +29,9 @@ TONES = ["auto", "funny", "analytical", "controversial"]
 
 ENABLE_POSTING_HOURS = (7, 9)  # 7 AM to 9 AM
 
+SUBREDDIT_ATTEMPTS = 3  # candidate subreddits fetched concurrently
+SUBREDDIT_FETCH_TIMEOUT = 15  # seconds per subreddit (list + filter)
+
 logger = init_logger(__name__)
 
 # Global clients (similar to routes.py pattern)
@@ -35,6 +44,7 @@ async def get_reddit_client():
     global reddit_client
     if reddit_client is None:
         reddit_client = AsyncRedditClient()
+        startup.mark("reddit_client_ready")
     return reddit_client
 
 
@@ -48,16 +58,19 @@ async def get_llm_client():
 
 async def cleanup():
     """Clean up resources"""
-    global reddit_client
+    global reddit_client, llm_client
     if reddit_client:
         await reddit_client.close()
         reddit_client = None
+    if llm_client:
+        llm_client.close()
+        llm_client = None
 
 
-def select_random_subreddit() -> str:
-    """Select a random subreddit from the predefined list"""
-    selected = random.choice(SUBREDDITS)
-    logger.info(f"Selected subreddit: r/{selected}")
+def select_random_subreddits(count: int = SUBREDDIT_ATTEMPTS) -> list[str]:
+    """Select distinct random subreddits from the predefined list"""
+    selected = random.sample(SUBREDDITS, k=min(count, len(SUBREDDITS)))
+    logger.info(f"Selected subreddits: {', '.join(f'r/{s}' for s in selected)}")
     return selected
 
 
@@ -80,10 +93,46 @@ def is_posting_time() -> bool:
     return is_allowed
 
 
+class RunStats:
+    """
+    Wall time spent in each pipeline stage of a run, and filter outcomes
+
+    Stages that run concurrently (list/filter across subreddits) are summed.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.filtering = FilterStats()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with span(f"stage.{name}"):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def summary(self):
+        lines = ["Run Timings:"]
+        for name, seconds in self.timings.items():
+            lines.append(f"- {name}: {seconds * 1000:.0f} ms")
+
+        calls = []
+        for label, client in (("reddit", reddit_client), ("llm", llm_client)):
+            if client is not None:
+                calls += [f"{label}.{k}={v}" for k, v in client.upstream_calls.items()]
+        lines.append(f"Upstream calls: {', '.join(calls) or 'none'}")
+        lines.append(f"Filtering: {self.filtering.summary()}")
+        return "\n".join(lines)
+
+
 async def get_posts_from_subreddit(subreddit: str):
-    """Fetch top posts from a subreddit"""
+    """Stage 1 (list): fetch top posts from a subreddit"""
     try:
         reddit_client = await get_reddit_client()
+        startup.mark("first_network_call")
         posts = await reddit_client.get_top_posts(subreddit, limit=DEFAULT_POST_LIMIT)
         if not posts:
             raise Exception("No posts found or subreddit not accessible")
@@ -94,41 +143,60 @@ async def get_posts_from_subreddit(subreddit: str):
         raise
 
 
-async def get_post_details(post):
-    """Fetch detailed post information with comments"""
-    try:
-        reddit_client = await get_reddit_client()
-
-        # Load the post fully (similar to routes.py)
-        full_post = await reddit_client.get_submission_by_id(post.id)
-
-        post_data = await reddit_client.get_post_data(full_post)
-        comments_data = await reddit_client.get_top_comments(
-            full_post, limit=DEFAULT_COMMENT_LIMIT
-        )
-
-        post_data["comments"] = comments_data
-        return post_data
-    except Exception as e:
-        logger.error(f"Error fetching post details: {e}")
-        raise
-
-
-async def select_random_post(subreddit: str):
+async def filter_suitable_posts(posts, stats: RunStats, dry_run: bool = True):
+    """
+    Stage 2 (filter): keep posts that pass the listing rules (no network)
+
+    The whole listing is evaluated at once, before any comments are fetched.
+    Posts an earlier run already handled are dropped first. Live runs record
+    the posts the rules reject; suitable posts stay available to later runs
+    unless they are chosen. Dry runs only read the index so testing doesn't
+    use up posts for the real schedule.
+    """
+    reddit_client = await get_reddit_client()
+    llm_client = await get_llm_client()
+    post_index = reddit_client.post_index
+
+    seen = post_index.seen(post.id for post in posts)
+    if seen:
+        logger.info(f"Skipping {len(seen)} already processed post(s)")
+        stats.filtering.count_rejected("already_processed", len(seen))
+
+    # Listing submissions already carry title/score/etc.
+    posts_by_id = {post.id: post for post in posts if post.id not in seen}
+    posts_data = [await reddit_client.get_post_data(p) for p in posts_by_id.values()]
+
+    accepted, rejected = llm_client.post_filter.evaluate(
+        posts_data, stats=stats.filtering
+    )
+    for post_data, rule in rejected:
+        logger.debug(f"Rejected post {post_data['id']}: {rule.reason}")
+        if not dry_run:
+            post_index.record(
+                post_data["id"], "evaluated", subreddit=post_data["subreddit"]
+            )
+    return [posts_by_id[post_data["id"]] for post_data in accepted]
+
+
+async def load_post(post):
+    """Stage 3 (load): load the chosen submission once, with its comments"""
+    reddit_client = await get_reddit_client()
+
+    # One request returns both the full submission and its comment forest
+    # (or none at all if the snapshot store has it)
+    return await reddit_client.get_post_with_comments_by_id(
+        post.id, comment_limit=DEFAULT_COMMENT_LIMIT
+    )
+
+
+async def select_random_post(subreddit: str, stats: RunStats, dry_run: bool = True):
     """Select a random suitable post from subreddit"""
     try:
-        posts = await get_posts_from_subreddit(subreddit)
-        llm_client = await get_llm_client()
-        reddit_client = await get_reddit_client()
+        with stats.stage("list"):
+            posts = await get_posts_from_subreddit(subreddit)
 
-        # Filter suitable posts
-        suitable_posts = []
-        for post in posts:
-            post_data = await reddit_client.get_post_data(post)
-
-            relevance = llm_client.analyze_post_relevance(post_data)
-            if relevance["suitable"]:
-                suitable_posts.append(post)
+        with stats.stage("filter"):
+            suitable_posts = await filter_suitable_posts(posts, stats, dry_run=dry_run)
 
         if not suitable_posts:
             logger.warning(f"No suitable posts found in r/{subreddit}")
@@ -142,61 +210,112 @@ async def select_random_post(subreddit: str):
         return None
 
 
+async def select_candidate(stats: RunStats, dry_run: bool = True):
+    """
+    Run the list and filter stages for several subreddits concurrently
+
+    The first subreddit that yields a suitable post wins; fetches still in
+    flight are cancelled. A slow or broken subreddit costs at most
+    SUBREDDIT_FETCH_TIMEOUT instead of a full serial attempt.
+
+    Returns:
+        tuple: (subreddit, post), or (None, None) if no subreddit had one
+    """
+    tasks = {
+        asyncio.create_task(
+            asyncio.wait_for(
+                select_random_post(subreddit, stats, dry_run=dry_run),
+                timeout=SUBREDDIT_FETCH_TIMEOUT,
+            )
+        ): subreddit
+        for subreddit in select_random_subreddits()
+    }
+    try:
+        async for task in asyncio.as_completed(tasks):
+            subreddit = tasks[task]
+            try:
+                post = task.result()
+            except TimeoutError:
+                logger.warning(f"Timed out fetching candidates from r/{subreddit}")
+                continue
+            if post:
+                logger.info(f"Selected subreddit: r/{subreddit}")
+                return subreddit, post
+        return None, None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 async def generate_and_post_comment(dry_run: bool = True):
-    """Main function to generate and post a daily comment"""
+    """
+    Main function to generate and post a daily comment
+
+    Runs the pipeline list -> filter -> load -> generate -> post, passing the
+    loaded objects along so the chosen submission is fetched exactly once.
+    """
+    stats = RunStats()
     try:
         # Check posting time (skip for dry runs)
         if not dry_run and not is_posting_time():
             logger.info("Skipping posting - outside of allowed hours")
             return False
 
-        # Select random subreddit and post
-        subreddit = select_random_subreddit()
-
-        # Try up to 3 different subreddits if needed
-        post = None
-        for attempt in range(3):
-            if attempt > 0:
-                logger.info(f"Attempt {attempt + 1}: Trying different subreddit...")
-                subreddit = select_random_subreddit()
-
-            post = await select_random_post(subreddit)
-            if post:
-                break
+        # Select random subreddits and take the first suitable post
+        subreddit, post = await select_candidate(stats, dry_run=dry_run)
 
         if not post:
             logger.error("Failed to select a suitable post from any subreddit")
             return False
 
-        # Get clients and post data
-        reddit_client = await get_reddit_client()
-        llm_client = await get_llm_client()
-
-        post = await reddit_client.get_submission_by_id(post.id)
-        post_data = await reddit_client.get_post_data(post)
+        with stats.stage("load"):
+            post_data = await load_post(post)
         logger.info(f"Selected post: {post_data['title']}")
-        comments_data = await reddit_client.get_top_comments(
-            post, limit=DEFAULT_COMMENT_LIMIT
+
+        # The chosen post is not offered again, whatever happens to it next
+        if not dry_run:
+            reddit_client = await get_reddit_client()
+            reddit_client.post_index.record(
+                post_data["id"], "evaluated", subreddit=subreddit
+            )
+
+        # Rules that need the comments run on the loaded post only
+        llm_client = await get_llm_client()
+        _, rejected = llm_client.post_filter.evaluate(
+            [post_data], stage=COMMENTS, stats=stats.filtering
         )
+        if rejected:
+            logger.warning(f"Selected post not suitable: {rejected[0][1].reason}")
+            return False
 
         # Select random tone and generate comment
         tone = select_random_tone()
 
         logger.info("Generating comment...")
-        result = llm_client.generate_comment(post_data, comments_data, tone=tone)
+        with stats.stage("generate"):
+            result = await llm_client.generate_comment(
+                post_data, post_data["comments"], tone=tone
+            )
 
         if not result["success"]:
             logger.error(f"Comment generation failed: {result['error']}")
             return False
 
+        if not dry_run:
+            reddit_client = await get_reddit_client()
+            reddit_client.post_index.record(post_data["id"], "generated")
+
         logger.info(f"Generated {result['tone']} comment ({result['length']} chars)")
         logger.info(f"Comment preview: {result['comment'][:100]}...")
 
         # Post comment
         logger.info(f"Posting comment (dry_run={dry_run})...")
-        post_result = await reddit_client.post_comment(
-            post_data["id"], result["comment"], dry_run=dry_run
-        )
+        reddit_client = await get_reddit_client()
+        with stats.stage("dry_run" if dry_run else "post"):
+            post_result = await reddit_client.post_comment(
+                post_data["id"], result["comment"], dry_run=dry_run
+            )
 
         if post_result["success"]:
             if dry_run:
@@ -205,6 +324,8 @@ async def generate_and_post_comment(dry_run: bool = True):
                 logger.info("✅ Comment posted successfully!")
                 if "comment_url" in post_result:
                     logger.info(f"Comment URL: {post_result['comment_url']}")
+                if result["generation_id"] is not None:
+                    llm_client.generations.mark_posted(result["generation_id"])
 
             # Log summary
             logger.info(f"""
@@ -227,11 +348,14 @@ Daily Comment Summary:
         return False
 
     finally:
+        logger.info(stats.summary())
         await cleanup()
 
 
 async def main():
     """Main entry point"""
+    request_id_var.set(new_request_id())  # correlate all log lines of this run
+    startup.mark("main_started")
     logger.info("=== Daily Reddit Commenter Started ===")
     logger.info(f"Timestamp: {datetime.now().isoformat()}")
 
@@ -243,7 +367,12 @@ async def main():
     else:
         logger.info("🚀 Running in LIVE mode (will actually post)")
 
-    success = await generate_and_post_comment(dry_run=dry_run)
+    with start_trace("auto_commenter.run", kind=None, dry_run=dry_run):
+        success = await generate_and_post_comment(dry_run=dry_run)
+
+    if "--profile-startup" in sys.argv:
+        # Printed rather than logged: the report is longer than a log field
+        print(startup.report("app.scripts.auto_commenter"), file=sys.stderr)
 
     if success:
         logger.info("=== Daily Reddit Commenter Completed Successfully ===")
@@ -253,4 +382,5 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    with profile_run("auto_commenter", force="--profile" in sys.argv):
+        asyncio.run(main())
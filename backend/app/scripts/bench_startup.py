@@ -0,0 +1,68 @@
+"""
+Startup Benchmark
+Guards the cold import time of the cron entry point against regressions
+
+Usage:
+    uv run -m app.scripts.bench_startup [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_POINT = "app.scripts.auto_commenter"
+
+# Must stay lazy: importing any of these at module level defeats the point
+HEAVY_MODULES = ["asyncpraw", "langchain_core", "langchain_google_genai"]
+
+DEFAULT_RUNS = 7
+DEFAULT_BUDGET_MS = 250
+
+CHECK_SNIPPET = f"""
+import sys
+import {ENTRY_POINT}
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+if loaded:
+    sys.exit("eagerly imported: " + ", ".join(loaded))
+"""
+
+
+def time_command(code):
+    """Wall time (ms) of a fresh interpreter running `code`"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    check = subprocess.run(
+        [sys.executable, "-c", CHECK_SNIPPET], capture_output=True, text=True
+    )
+    if check.returncode != 0:
+        print(f"❌ {ENTRY_POINT}: {check.stderr.strip()}")
+        sys.exit(1)
+
+    # Subtract bare interpreter start so the budget only covers our imports
+    baseline = statistics.median(time_command("pass") for _ in range(args.runs))
+    samples = [time_command(f"import {ENTRY_POINT}") for _ in range(args.runs)]
+    import_ms = statistics.median(samples) - baseline
+
+    print(f"Interpreter start: {baseline:7.1f} ms")
+    print(f"Entry point import: {import_ms:6.1f} ms (median of {args.runs} runs)")
+    print(f"Budget: {args.budget_ms:.0f} ms")
+
+    if import_ms > args.budget_ms:
+        print("❌ Startup regression: import time is over budget")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
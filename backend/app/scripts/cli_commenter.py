@@ -4,9 +4,16 @@ Posts AI-generated comments to Reddit with human oversight
 """
 
 import asyncio
-
-from app.core.constants import DEFAULT_COMMENT_LIMIT, DEFAULT_POST_LIMIT
-from app.core.logger import init_logger
+import sys
+import threading
+
+from app.core.constants import (
+    DEFAULT_COMMENT_LIMIT,
+    DEFAULT_POST_LIMIT,
+    PREFETCH_CONCURRENCY,
+)
+from app.core.logger import init_logger, new_request_id, request_id_var
+from app.core.profiling import profile_run
 from app.services.async_reddit_client import AsyncRedditClient
 from app.services.llm_client import LLMClient
 
@@ -15,6 +22,7 @@ logger = init_logger(__name__)
 # Global clients
 reddit_client = None
 llm_client = None
+llm_client_task = None  # LLM client being built in the background
 
 
 async def get_reddit_client():
@@ -25,20 +33,85 @@ async def get_reddit_client():
     return reddit_client
 
 
+def build_llm_client():
+    """Create the LLM client and load its chat model"""
+    client = LLMClient()
+    client.llm  # imports LangChain, the slow part
+    return client
+
+
+def start_llm_client():
+    """Start building the LLM client in a worker thread"""
+    global llm_client_task
+    if llm_client_task is None:
+        llm_client_task = asyncio.create_task(asyncio.to_thread(build_llm_client))
+
+
 async def get_llm_client():
     """Get or create LLM client instance"""
     global llm_client
     if llm_client is None:
-        llm_client = LLMClient()
+        start_llm_client()
+        llm_client = await llm_client_task
     return llm_client
 
 
 async def cleanup():
     """Clean up resources"""
-    global reddit_client
+    global reddit_client, llm_client, llm_client_task
     if reddit_client:
         await reddit_client.close()
         reddit_client = None
+    if llm_client is None and llm_client_task is not None:
+        # The thread can't be interrupted; wait for it so the client is closed
+        results = await asyncio.gather(llm_client_task, return_exceptions=True)
+        if isinstance(results[0], LLMClient):
+            llm_client = results[0]
+    llm_client_task = None
+    if llm_client:
+        llm_client.close()
+        llm_client = None
+
+
+class CommentPrefetcher:
+    """
+    Fetches the comments of the listed posts while the user is choosing
+
+    At most `concurrency` posts are fetched at once, in listing order.
+    """
+
+    def __init__(self, client, concurrency=PREFETCH_CONCURRENCY):
+        self.client = client
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = {}
+
+    def start(self, post_ids):
+        for post_id in post_ids:
+            if post_id not in self._tasks:
+                self._tasks[post_id] = asyncio.create_task(self._fetch(post_id))
+
+    async def _fetch(self, post_id):
+        async with self._semaphore:
+            return await self.client.get_post_with_comments_by_id(
+                post_id, comment_limit=DEFAULT_COMMENT_LIMIT
+            )
+
+    async def get(self, post_id):
+        """Post data with comments, cancelling the prefetches of other posts"""
+        task = self._tasks.pop(post_id, None)
+        await self.cancel()
+        if task is None:
+            return await self._fetch(post_id)
+        if task.done():
+            logger.info(f"Comments for post {post_id} were prefetched")
+        return await task
+
+    async def cancel(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 def display_posts(posts_data):
@@ -90,11 +163,40 @@ def display_tone_options(tones):
     print()
 
 
-def get_user_choice(prompt, min_val, max_val):
+async def ainput(prompt=""):
+    """
+    input() that keeps the event loop running background work
+
+    The read runs in a daemon thread, which can't hold up exit if the session
+    is interrupted while waiting for the user.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def read():
+        try:
+            result, error = input(prompt), None
+        except (EOFError, KeyboardInterrupt) as e:
+            result, error = None, e
+        loop.call_soon_threadsafe(resolve, result, error)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
+async def get_user_choice(prompt, min_val, max_val):
     """Get valid user choice within range"""
     while True:
         try:
-            choice = int(input(prompt))
+            choice = int(await ainput(prompt))
             if min_val <= choice <= max_val:
                 return choice
             print(f"Please enter a number between {min_val} and {max_val}")
@@ -102,10 +204,10 @@ def get_user_choice(prompt, min_val, max_val):
             print("Please enter a valid number")
 
 
-def get_yes_no(prompt):
+async def get_yes_no(prompt):
     """Get yes/no response from user"""
     while True:
-        response = input(prompt).lower().strip()
+        response = (await ainput(prompt)).lower().strip()
         if response in ["y", "yes"]:
             return True
         elif response in ["n", "no"]:
@@ -134,24 +236,6 @@ async def get_posts_from_subreddit(subreddit: str):
         raise
 
 
-async def get_post_with_comments(post, post_data):
-    """Get detailed post with comments"""
-    try:
-        reddit_client = await get_reddit_client()
-
-        print("\nFetching comments for selected postapp..")
-        comments_data = await reddit_client.get_top_comments(
-            post, limit=DEFAULT_COMMENT_LIMIT
-        )
-
-        post_data["comments"] = comments_data
-        logger.info(f"Fetched {len(comments_data)} comments for post {post_data['id']}")
-        return post_data
-    except Exception as e:
-        logger.error(f"Error fetching comments: {e}")
-        raise
-
-
 async def generate_comment_for_post(post_data, tone: str):
     """Generate comment with specified tone"""
     try:
@@ -161,11 +245,11 @@ async def generate_comment_for_post(post_data, tone: str):
         relevance = llm_client.analyze_post_relevance(post_data)
         if not relevance["suitable"]:
             print(f"\n⚠️  Warning: {relevance['reason']}")
-            if not get_yes_no("Continue anyway? (y/n): "):
+            if not await get_yes_no("Continue anyway? (y/n): "):
                 return None
 
         print(f"\n🤖 Generating {tone} commentapp..")
-        result = llm_client.generate_comment(
+        result = await llm_client.generate_comment(
             post_data, post_data["comments"], tone=tone
         )
 
@@ -179,7 +263,9 @@ async def generate_comment_for_post(post_data, tone: str):
         return None
 
 
-async def post_comment_to_reddit(post_data, comment_text, dry_run: bool = True):
+async def post_comment_to_reddit(
+    post_data, comment_text, dry_run: bool = True, generation_id=None
+):
     """Post comment to Reddit"""
     try:
         reddit_client = await get_reddit_client()
@@ -198,6 +284,9 @@ async def post_comment_to_reddit(post_data, comment_text, dry_run: bool = True):
                 print("✅ Comment posted successfully!")
                 if "comment_url" in result:
                     print(f"URL: {result['comment_url']}")
+                if generation_id is not None:
+                    llm_client = await get_llm_client()
+                    llm_client.generations.mark_posted(generation_id)
         else:
             print(f"❌ Failed to post: {result['error']}")
 
@@ -209,12 +298,17 @@ async def post_comment_to_reddit(post_data, comment_text, dry_run: bool = True):
 
 async def main():
     """Main interactive commenter function"""
+    request_id_var.set(new_request_id())  # correlate all log lines of this session
+    prefetcher = None
     try:
         logger.info("=== Interactive Reddit Commenter Started ===")
         print("🤖 Welcome to Reddit Auto Commenter!")
 
+        # Build the LLM client while the user types
+        start_llm_client()
+
         # Get subreddit name
-        subreddit = input("Enter subreddit name (without r/): ").strip()
+        subreddit = (await ainput("Enter subreddit name (without r/): ")).strip()
         if not subreddit:
             print("Subreddit name cannot be empty")
             return
@@ -231,19 +325,21 @@ async def main():
             print("No posts found or error occurred")
             return
 
+        # Fetch comments of every listed post while the user reads the list
+        prefetcher = CommentPrefetcher(reddit_client)
+        prefetcher.start(post_data["id"] for post_data in posts_data)
+
         # Display posts and get selection
         display_posts(posts_data)
-        choice = get_user_choice(
+        choice = await get_user_choice(
             f"Select post (1-{len(posts_data)}): ", 1, len(posts_data)
         )
-        selected_post_index = choice - 1
-        selected_post = posts[selected_post_index]
-        selected_post_data = posts_data[selected_post_index]
+        selected_post_data = posts_data[choice - 1]
 
-        # Fetch comments for selected post
+        # Comments of the selected post; the other prefetches are cancelled
         try:
-            post = await reddit_client.get_submission_by_id(selected_post.id)
-            selected_post_data = await get_post_with_comments(post, selected_post_data)
+            print("\nFetching comments for selected post...")
+            selected_post_data = await prefetcher.get(selected_post_data["id"])
         except Exception as e:
             print(f"Failed to fetch comments: {e}")
             return
@@ -256,7 +352,7 @@ async def main():
         available_tones = llm_client.get_available_tones()
         display_tone_options(available_tones)
 
-        tone_choice = get_user_choice(
+        tone_choice = await get_user_choice(
             f"Select comment tone (1-{len(available_tones)}): ", 1, len(available_tones)
         )
         selected_tone = available_tones[tone_choice - 1]
@@ -272,11 +368,16 @@ async def main():
         print("-" * 40)
 
         # Ask whether to post
-        should_post = get_yes_no("\nPost this comment? (y/n): ")
+        should_post = await get_yes_no("\nPost this comment? (y/n): ")
         dry_run = not should_post
 
         # Post comment (either dry run or live)
-        await post_comment_to_reddit(selected_post_data, result["comment"], dry_run)
+        await post_comment_to_reddit(
+            selected_post_data,
+            result["comment"],
+            dry_run,
+            generation_id=result["generation_id"],
+        )
 
         # Log summary
         logger.info(f"""
@@ -292,14 +393,18 @@ Comment Session Summary:
 
         print("\n✨ Session completed!")
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError, asyncio.CancelledError):
+        # Ctrl+C while waiting for input cancels this task
         print("\n\n👋 Goodbye!")
     except Exception as e:
         logger.error(f"Interactive commenter failed: {e}")
         print(f"❌ Error: {e}")
     finally:
+        if prefetcher:
+            await prefetcher.cancel()
         await cleanup()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    with profile_run("cli_commenter", force="--profile" in sys.argv):
+        asyncio.run(main())
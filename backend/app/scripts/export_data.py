@@ -0,0 +1,247 @@
+"""
+Dataset Export
+Stream stored posts, comments and generations to files for offline analysis
+
+    python -m app.scripts.export_data                    # changes since last run
+    python -m app.scripts.export_data --full --format parquet
+    python -m app.scripts.export_data --tables generations --out /tmp/exports
+
+Rows are read in keyset-ordered chunks inside one read transaction and
+written chunk by chunk, so memory use does not grow with the table. Each
+run writes one file per table (none if nothing changed) and records in
+export_state.json the change timestamp it covered up to; the next run
+exports only rows changed after it. A row changed again after its export
+appears again in a later file, so consumers keep the latest version of
+each id.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.startup import lazy_import
+
+DEFAULT_OUT_DIR = "data/exports"
+DEFAULT_CHUNK_SIZE = 1000
+STATE_FILE = "export_state.json"
+
+# Rows stamped in the last few seconds are left for the next run, in case a
+# writer that took its timestamp earlier has not committed yet
+SETTLE_TIME = 5.0
+
+
+def export_tables():
+    """table name -> (database path, change timestamp column)"""
+    return {
+        "posts": (settings.SNAPSHOT_DB_PATH, "refreshed_at"),
+        "comments": (settings.SNAPSHOT_DB_PATH, "refreshed_at"),
+        "generations": (settings.GENERATIONS_DB_PATH, "updated_at"),
+    }
+
+
+def parse_args(argv=None):
+    tables = list(export_tables())
+    parser = argparse.ArgumentParser(description="Export stored records")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument(
+        "--tables",
+        type=lambda value: value.split(","),
+        default=tables,
+        help=f"comma-separated subset of {','.join(tables)}",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="ignore the saved state; export all"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    unknown = set(args.tables) - set(tables)
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+    return args
+
+
+def load_state(out_dir):
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(out_dir, state):
+    """Replace the state file atomically"""
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def connect_readonly(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def table_columns(conn, table):
+    """(name, declared type) of each column"""
+    return [
+        (row["name"], row["type"])
+        for row in conn.execute(f"PRAGMA table_info({table})")
+    ]
+
+
+def iter_chunks(conn, table, ts_column, since, until, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Rows changed in (since, until], as lists of dicts in (timestamp, rowid) order
+
+    Each chunk resumes after the last key of the previous one, which the
+    timestamp index serves directly however far into the table it is.
+    """
+    key = (since if since is not None else float("-inf"), -1)
+    while True:
+        rows = conn.execute(
+            f"SELECT rowid AS _rowid, * FROM {table} "
+            f"WHERE ({ts_column}, rowid) > (?, ?) AND {ts_column} <= ? "
+            f"ORDER BY {ts_column}, rowid LIMIT ?",
+            (*key, until, chunk_size),
+        ).fetchall()
+        if not rows:
+            return
+        key = (rows[-1][ts_column], rows[-1]["_rowid"])
+        yield [{k: row[k] for k in row.keys() if k != "_rowid"} for row in rows]
+
+
+class JSONLWriter:
+    extension = "jsonl"
+
+    def __init__(self, path, columns):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        self._file.write(
+            "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """One row group per chunk, with a schema from the declared column types"""
+
+    extension = "parquet"
+
+    def __init__(self, path, columns):
+        try:
+            pa = lazy_import("pyarrow")
+            pq = lazy_import("pyarrow.parquet")
+        except ImportError as e:
+            raise ValueError(
+                "--format parquet requires the pyarrow package (uv add pyarrow)"
+            ) from e
+        types = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                (name, types.get(declared.upper(), pa.string()))
+                for name, declared in columns
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        batch = self._pa.RecordBatch.from_pylist(rows, schema=self._schema)
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"jsonl": JSONLWriter, "parquet": ParquetWriter}
+
+
+def export_table(table, out_dir, fmt, since, until, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write the rows of `table` changed in (since, until] to a new file
+
+    Returns:
+        tuple: (file path, or None if nothing changed; row count)
+    """
+    db_path, ts_column = export_tables()[table]
+    if not os.path.exists(db_path):
+        return None, 0
+
+    conn = connect_readonly(db_path)
+    try:
+        conn.execute("BEGIN")  # one snapshot for the whole table
+        writer_class = WRITERS[fmt]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(out_dir, f"{table}-{stamp}.{writer_class.extension}")
+        writer = None
+        count = 0
+        try:
+            for rows in iter_chunks(conn, table, ts_column, since, until, chunk_size):
+                if writer is None:
+                    writer = writer_class(path + ".tmp", table_columns(conn, table))
+                writer.write(rows)
+                count += len(rows)
+        except BaseException:
+            if writer is not None:
+                writer.close()
+                os.remove(path + ".tmp")
+            raise
+        if writer is not None:
+            writer.close()
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    if writer is None:
+        return None, 0
+    os.replace(path + ".tmp", path)  # complete files only
+    return path, count
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.out, exist_ok=True)
+    state = load_state(args.out)
+    until = time.time() - SETTLE_TIME
+
+    for table in args.tables:
+        since = None if args.full else state.get(table, {}).get("watermark")
+        start = time.perf_counter()
+        try:
+            path, count = export_table(
+                table, args.out, args.format, since, until, args.chunk_size
+            )
+        except Exception as e:
+            print(f"❌ Export of {table} failed: {e}", file=sys.stderr)
+            return 1
+
+        elapsed = time.perf_counter() - start
+        if path is None:
+            print(f"{table}: no changes")
+        else:
+            print(f"{table}: {count} rows -> {path} ({elapsed:.1f}s)")
+
+        # Saved per table, so a failure later keeps the finished exports
+        state[table] = {
+            "watermark": until,
+            "exported_at": time.time(),
+            "rows": count,
+            "file": os.path.basename(path) if path else None,
+        }
+        save_state(args.out, state)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
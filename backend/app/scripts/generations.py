@@ -0,0 +1,81 @@
+"""
+Generation History
+Search and page through stored generated comments
+
+    python -m app.scripts.generations "climate AND policy" --subreddit AskReddit
+    python -m app.scripts.generations --posted --limit 10 --before 1234
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from app.services.generation_store import MAX_PAGE_SIZE, GenerationStore
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search generated comments")
+    parser.add_argument("search", nargs="?", help="full-text query (FTS5 syntax)")
+    parser.add_argument("--post-id")
+    parser.add_argument("--subreddit")
+    parser.add_argument("--tone")
+    parser.add_argument("--model")
+    posted = parser.add_mutually_exclusive_group()
+    posted.add_argument("--posted", dest="posted", action="store_true", default=None)
+    posted.add_argument("--not-posted", dest="posted", action="store_false")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO date/time")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO date/time")
+    parser.add_argument("--limit", type=int, default=20, help=f"max {MAX_PAGE_SIZE}")
+    parser.add_argument("--before", type=int, help="cursor printed by the last page")
+    parser.add_argument("--full", action="store_true", help="print whole comments")
+    return parser.parse_args(argv)
+
+
+def display_generation(row, full=False):
+    created = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M")
+    tokens = f"{row['input_tokens'] or '?'}/{row['output_tokens'] or '?'}"
+    latency = f"{row['latency_ms']:.0f} ms" if row["latency_ms"] is not None else "?"
+    print(
+        f"#{row['id']} {created} r/{row['subreddit']} post={row['post_id']} "
+        f"tone={row['tone']} model={row['model']} tokens={tokens} "
+        f"latency={latency} {'POSTED' if row['posted'] else ''}"
+    )
+    text = row["text"] if full else row["text"][:160].replace("\n", " ")
+    print(f"   {text}\n")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = GenerationStore()
+    try:
+        rows, next_cursor = store.query(
+            search=args.search,
+            before_id=args.before,
+            limit=args.limit,
+            post_id=args.post_id,
+            subreddit=args.subreddit,
+            tone=args.tone,
+            model=args.model,
+            posted=args.posted,
+            since=args.since.timestamp() if args.since else None,
+            until=args.until.timestamp() if args.until else None,
+        )
+    except Exception as e:
+        print(f"❌ Query failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+
+    if not rows:
+        print("No generations found.")
+        return 0
+
+    for row in rows:
+        display_generation(row, full=args.full)
+    if next_cursor is not None:
+        print(f"More results: --before {next_cursor}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
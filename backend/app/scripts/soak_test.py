@@ -0,0 +1,559 @@
+"""
+Soak Test
+Run the API in-process for a long time and fail if resources keep growing
+
+    python -m app.scripts.soak_test --duration 3600
+    python -m app.scripts.soak_test --duration 86400 --sample-interval 60
+
+Reddit and Gemini are replaced by a local HTTP stand-in, started in a
+thread of this process, that serves synthetic listings, posts with full
+comment forests and completions of realistic size. The clients reach it
+over real sockets (REDDIT_OAUTH_URL, REDDIT_URL, GEMINI_BASE_URL), through
+the same asyncpraw, Gemini SDK and probe sessions as in production, so
+leaked connections show up in the descriptor count (which includes the
+stand-in's end of each connection). Workers call the listing, post,
+generation and readiness endpoints through the ASGI app with the response
+cache and snapshot reuse turned off, so every request goes through the
+Reddit and LLM clients.
+
+After a warm-up, RSS, tracemalloc's traced memory, open file descriptors
+and event-loop lag are sampled at every interval. The run fails if memory
+or descriptors grew beyond their thresholds from the post-warm-up baseline
+or the loop lag was too high; the allocation sites that grew most are
+printed either way.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+SUBREDDITS = ["soaktest", "soakother", "soakthird"]
+POSTS_PER_LISTING = 10
+COMMENTS_PER_POST = 60
+TONES = ["auto", "funny", "analytical"]
+
+# (endpoint kind, weight) of the request mix
+REQUEST_MIX = [("listing", 4), ("post", 4), ("generate", 2), ("ready", 1)]
+
+TOP_ALLOCATORS = 10
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test the API in-process")
+    parser.add_argument("--duration", type=float, default=600, help="seconds")
+    parser.add_argument("--warmup", type=float, default=30, help="seconds")
+    parser.add_argument("--sample-interval", type=float, default=10, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=0.05,
+        help="multiplier of the stand-in's upstream latencies",
+    )
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=32)
+    parser.add_argument("--max-fd-growth", type=int, default=16)
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.001,
+        help="largest tolerated fraction of failed requests",
+    )
+    parser.add_argument(
+        "--max-loop-lag-ms",
+        type=float,
+        default=250,
+        help="limit of the 95th percentile of per-interval maximum lag",
+    )
+    parser.add_argument("--report", help="write the samples as JSON to this path")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def configure_environment(work_dir, upstream_url):
+    """Settings for an isolated run against the stand-in; set before import"""
+    defaults = {
+        "REDDIT_CLIENT_ID": "soak-test",
+        "REDDIT_CLIENT_SECRET": "soak-test",
+        "GEMINI_API_KEY": "soak-test",
+        "LOG_LEVEL": "WARNING",
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    os.environ.update(
+        {
+            "REDDIT_USERNAME": "",
+            "REDDIT_PASSWORD": "",
+            "RECORD_MODE": "off",
+            "REDDIT_OAUTH_URL": upstream_url,
+            "REDDIT_URL": upstream_url,
+            "GEMINI_BASE_URL": upstream_url,
+            "CACHE_BACKEND": "memory",
+            "CACHE_MAX_AGE_POSTS": "0",
+            "CACHE_MAX_AGE_POST": "0",
+            "SNAPSHOT_MAX_AGE": "0",
+            "SNAPSHOT_DB_PATH": os.path.join(work_dir, "snapshots.sqlite3"),
+            "PROCESSED_INDEX_PATH": os.path.join(work_dir, "processed.sqlite3"),
+            "GENERATIONS_DB_PATH": os.path.join(work_dir, "generations.sqlite3"),
+            "CACHE_DB_PATH": os.path.join(work_dir, "cache.sqlite3"),
+        }
+    )
+
+
+# Upstream stand-in
+
+
+def _text(rng, min_words, max_words):
+    words = ("the", "reddit", "soak", "comment", "memory", "socket", "loop", "test")
+    return " ".join(rng.choice(words) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _submission(rng, subreddit, post_id):
+    return {
+        "kind": "t3",
+        "data": {
+            "id": post_id,
+            "name": f"t3_{post_id}",
+            "title": f"Soak test post {post_id} " + _text(rng, 3, 12),
+            "selftext": _text(rng, 50, 400),
+            "url": f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/",
+            "permalink": f"/r/{subreddit}/comments/{post_id}/",
+            "subreddit": subreddit,
+            "author": f"user_{rng.randrange(10**6)}",
+            "score": rng.randint(0, 5000),
+            "num_comments": COMMENTS_PER_POST,
+            "created_utc": time.time() - rng.randint(0, 86400),
+        },
+    }
+
+
+def _comment(rng, subreddit, post_id, index):
+    comment_id = f"{post_id}c{index}"
+    return {
+        "kind": "t1",
+        "data": {
+            "id": comment_id,
+            "name": f"t1_{comment_id}",
+            "body": _text(rng, 10, 200),
+            "author": f"user_{rng.randrange(10**6)}",
+            "score": rng.randint(-5, 2000),
+            "created_utc": time.time() - rng.randint(0, 86400),
+            "parent_id": f"t3_{post_id}",
+            "link_id": f"t3_{post_id}",
+            "subreddit": subreddit,
+            "replies": "",
+        },
+    }
+
+
+def _listing(children):
+    return {"kind": "Listing", "data": {"children": children, "after": None}}
+
+
+def build_responses(rng):
+    """
+    Stand-in responses for every request the soak traffic makes
+
+    Returns:
+        tuple: ({(method, path): (encoded body, latency ms)}, completion
+        texts, ids of the posts in the listings)
+    """
+    responses = {}
+
+    def add(method, path, payload, latency_ms):
+        responses[(method, path)] = (json.dumps(payload).encode(), latency_ms)
+
+    token = {
+        "access_token": "soak",
+        "expires_in": 86400,
+        "scope": "*",
+        "token_type": "bearer",
+    }
+    add("POST", "/api/v1/access_token", token, 80)
+
+    post_ids = []
+    for s, subreddit in enumerate(SUBREDDITS):
+        ids = [f"soak{s}x{i}" for i in range(POSTS_PER_LISTING)]
+        submissions = [_submission(rng, subreddit, post_id) for post_id in ids]
+        add("GET", f"/r/{subreddit}/top", _listing(submissions), 250)
+        for submission in submissions:
+            post_id = submission["data"]["id"]
+            comments = [
+                _comment(rng, subreddit, post_id, i) for i in range(COMMENTS_PER_POST)
+            ]
+            payload = [_listing([submission]), _listing(comments)]
+            add("GET", f"/comments/{post_id}/", payload, 400)
+        post_ids += ids
+
+    # Health probe (PROBE_SUBREDDIT)
+    probe = _listing([_submission(rng, "announcements", "soakprobe")])
+    add("GET", "/r/announcements/new", probe, 150)
+
+    completions = [_text(rng, 20, 120) for _ in range(20)]
+    return responses, completions, post_ids
+
+
+def _completion(rng, text):
+    """generateContent response of the Gemini REST API"""
+    prompt_tokens = rng.randint(500, 3000)
+    output_tokens = rng.randint(40, 300)
+    return {
+        "candidates": [
+            {
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+    }
+
+
+class UpstreamStandIn:
+    """
+    Reddit and Gemini endpoints served by aiohttp on its own thread and loop
+
+    Each response is delayed by its upstream latency times `latency_scale`.
+    """
+
+    def __init__(self, sock, responses, completions, latency_scale, seed=0):
+        self.sock = sock
+        self.responses = responses
+        self.completions = completions
+        self.latency_scale = latency_scale
+        self.rng = random.Random(seed)
+        self.unknown = set()
+        self._loop = None
+        self._stopped = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(self._serve(),), name="upstream stand-in"
+        )
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+
+    async def _serve(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.SockSite(runner, self.sock).start()
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._ready.set()
+        try:
+            await self._stopped.wait()
+        finally:
+            await runner.cleanup()
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        path = request.path
+        if request.method == "POST" and path.endswith(":generateContent"):
+            await request.read()
+            text = self.rng.choice(self.completions)
+            body = json.dumps(_completion(self.rng, text)).encode()
+            latency_ms = self.rng.randint(800, 3000)
+        elif request.method == "GET" and path.startswith("/v1beta/models/"):
+            body, latency_ms = (
+                json.dumps({"name": path[len("/v1beta/") :]}).encode(),
+                100,
+            )
+        elif (request.method, path) in self.responses:
+            await request.read()
+            body, latency_ms = self.responses[(request.method, path)]
+        else:
+            if (request.method, path) not in self.unknown:
+                self.unknown.add((request.method, path))
+                print(f"⚠️  No stand-in for {request.method} {path}", file=sys.stderr)
+            return web.Response(status=404)
+
+        await asyncio.sleep(latency_ms / 1000 * self.latency_scale)
+        return web.Response(body=body, content_type="application/json")
+
+
+# Sampling
+
+
+def rss_mb():
+    """Current resident set size (peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return -1
+
+
+class LoopLagMonitor:
+    """Largest delay of a periodic wake-up since the last reset"""
+
+    def __init__(self, period=0.05):
+        self.period = period
+        self.max_lag = 0.0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.period)
+            self.max_lag = max(self.max_lag, loop.time() - start - self.period)
+
+    def reset(self):
+        lag, self.max_lag = self.max_lag, 0.0
+        return lag
+
+    async def skip_pause(self):
+        """Leave out a stall the harness caused itself (sampling)"""
+        await asyncio.sleep(self.period * 2)
+        self.max_lag = 0.0
+
+    async def stop(self):
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+class Traffic:
+    """Request counters shared by the workers"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = {}
+
+    def record(self, kind, status):
+        self.requests += 1
+        if status >= 400:
+            label = f"{kind}:{status}"
+            self.errors[label] = self.errors.get(label, 0) + 1
+
+
+async def worker(client, rng, post_ids, traffic, stop_at):
+    kinds = [kind for kind, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    while time.monotonic() < stop_at:
+        kind = rng.choices(kinds, weights)[0]
+        try:
+            if kind == "listing":
+                subreddit = rng.choice(SUBREDDITS)
+                response = await client.get(
+                    f"/posts/{subreddit}", params={"limit": POSTS_PER_LISTING}
+                )
+            elif kind == "post":
+                response = await client.get(f"/post/{rng.choice(post_ids)}")
+            elif kind == "generate":
+                response = await client.post(
+                    "/generate-comment",
+                    json={"post_id": rng.choice(post_ids), "tone": rng.choice(TONES)},
+                )
+            else:
+                response = await client.get("/readyz")
+            traffic.record(kind, response.status_code)
+        except Exception as e:
+            traffic.record(kind, 599)
+            print(f"⚠️  {kind} request failed: {e}", file=sys.stderr)
+
+
+def take_sample(elapsed, traffic, lag_monitor):
+    gc.collect()  # count only memory that is still referenced
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        "elapsed": round(elapsed, 1),
+        "requests": traffic.requests,
+        "errors": sum(traffic.errors.values()),
+        "rss_mb": round(rss_mb(), 1),
+        "traced_mb": round(traced / 1024 / 1024, 2),
+        "fds": open_fds(),
+        "loop_lag_ms": round(lag_monitor.reset() * 1000, 1),
+    }
+
+
+def print_sample(sample):
+    print(
+        f"{sample['elapsed']:>8.0f}s  requests={sample['requests']:<7} "
+        f"errors={sample['errors']:<4} rss={sample['rss_mb']:.1f}MB "
+        f"traced={sample['traced_mb']:.2f}MB fds={sample['fds']} "
+        f"lag={sample['loop_lag_ms']:.0f}ms"
+    )
+
+
+def evaluate(baseline, samples, traffic, args):
+    """Threshold violations; growth and lag are measured after warm-up"""
+    # Average the last few samples so one GC-timing blip doesn't decide
+    tail = samples[-3:]
+    failures = []
+    growth = {
+        "rss_mb": statistics.mean(s["rss_mb"] for s in tail) - baseline["rss_mb"],
+        "traced_mb": statistics.mean(s["traced_mb"] for s in tail)
+        - baseline["traced_mb"],
+        "fds": statistics.mean(s["fds"] for s in tail) - baseline["fds"],
+    }
+    if growth["rss_mb"] > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {growth['rss_mb']:.1f} MB")
+    if growth["traced_mb"] > args.max_traced_growth_mb:
+        failures.append(f"traced memory grew {growth['traced_mb']:.1f} MB")
+    if growth["fds"] > args.max_fd_growth:
+        failures.append(f"open file descriptors grew by {growth['fds']:.0f}")
+
+    lags = sorted(s["loop_lag_ms"] for s in samples)
+    p95_lag = lags[min(len(lags) - 1, int(len(lags) * 0.95))]
+    if p95_lag > args.max_loop_lag_ms:
+        failures.append(f"p95 event-loop lag {p95_lag:.0f} ms")
+
+    # A run whose requests fail can look flat while exercising nothing
+    errors = sum(traffic.errors.values())
+    if not traffic.requests:
+        failures.append("no requests completed")
+    elif errors / traffic.requests > args.max_error_rate:
+        failures.append(f"{errors} of {traffic.requests} requests failed")
+    return growth, p95_lag, failures
+
+
+async def run(args, post_ids):
+    import httpx
+
+    import main
+
+    rng = random.Random(args.seed)
+    traffic = Traffic()
+    lag_monitor = LoopLagMonitor()
+    samples = []
+    baseline = baseline_snapshot = None
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://soak", timeout=120
+        ) as client:
+            lag_monitor.start()
+            start = time.monotonic()
+            stop_at = start + args.warmup + args.duration
+            workers = [
+                asyncio.create_task(
+                    worker(
+                        client, random.Random(rng.random()), post_ids, traffic, stop_at
+                    )
+                )
+                for _ in range(args.concurrency)
+            ]
+
+            await asyncio.sleep(args.warmup)
+            lag_monitor.reset()
+            # The snapshot is kept until the end, so it is part of the baseline
+            baseline_snapshot = tracemalloc.take_snapshot()
+            baseline = take_sample(time.monotonic() - start, traffic, lag_monitor)
+            await lag_monitor.skip_pause()
+            print("baseline:")
+            print_sample(baseline)
+
+            while time.monotonic() < stop_at:
+                await asyncio.sleep(
+                    min(args.sample_interval, stop_at - time.monotonic())
+                )
+                sample = take_sample(time.monotonic() - start, traffic, lag_monitor)
+                await lag_monitor.skip_pause()
+                samples.append(sample)
+                print_sample(sample)
+
+            await asyncio.gather(*workers)
+            await lag_monitor.stop()
+            final_snapshot = tracemalloc.take_snapshot()
+
+    return traffic, baseline, samples, baseline_snapshot, final_snapshot
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sock = socket.create_server(("127.0.0.1", 0))
+    upstream_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    responses, completions, post_ids = build_responses(random.Random(args.seed))
+    stand_in = UpstreamStandIn(
+        sock, responses, completions, args.latency_scale, seed=args.seed
+    )
+
+    with tempfile.TemporaryDirectory(prefix="soak-") as work_dir:
+        configure_environment(work_dir, upstream_url)
+        stand_in.start()
+        tracemalloc.start()
+        print(
+            f"Soak test: {args.duration:.0f}s after {args.warmup:.0f}s warm-up, "
+            f"{args.concurrency} workers, samples every {args.sample_interval:.0f}s, "
+            f"upstreams at {upstream_url}"
+        )
+        try:
+            traffic, baseline, samples, before, after = asyncio.run(run(args, post_ids))
+        finally:
+            tracemalloc.stop()
+            stand_in.stop()
+
+    if not samples:
+        print("❌ No samples taken; increase --duration", file=sys.stderr)
+        return 1
+
+    growth, p95_lag, failures = evaluate(baseline, samples, traffic, args)
+
+    grown = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff > 0]
+    grown.sort(key=lambda stat: stat.size_diff, reverse=True)
+    print(f"\nTop {TOP_ALLOCATORS} allocation sites by growth since the baseline:")
+    for stat in grown[:TOP_ALLOCATORS]:
+        frame = stat.traceback[0]
+        print(
+            f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+7} blocks  "
+            f"{frame.filename}:{frame.lineno}"
+        )
+
+    print(
+        f"\nRequests: {traffic.requests}, errors: {traffic.errors or 'none'}\n"
+        f"Growth: RSS {growth['rss_mb']:+.1f} MB, traced {growth['traced_mb']:+.2f} MB, "
+        f"fds {growth['fds']:+.0f}; p95 loop lag {p95_lag:.0f} ms"
+    )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"baseline": baseline, "samples": samples}, f, indent=2)
+
+    if failures:
+        print(f"❌ Soak test failed: {'; '.join(failures)}")
+        return 1
+    print("✅ Soak test passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
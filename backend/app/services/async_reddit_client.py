@@ -1,4 +1,6 @@
-import asyncpraw
+import asyncio
+import time
+from collections import Counter
 
 from app.core.config import settings
 from app.core.constants import (
@@ -8,8 +10,14 @@ from app.core.constants import (
     DELETED_CONTENT,
     LINK_POST_PLACEHOLDER,
     MAX_COMMENT_LENGTH,
+    PROBE_SUBREDDIT,
 )
+from app.core.deadline import DeadlineExceeded, deadline_scope
 from app.core.logger import init_logger
+from app.core.startup import lazy_import
+from app.core.tracing import traced
+from app.services.post_index import ProcessedPostIndex
+from app.services.snapshot_store import POST_FIELDS, SnapshotStore
 
 logger = init_logger(__name__)
 
@@ -21,6 +29,26 @@ class AsyncRedditClient:
         if not settings.REDDIT_CLIENT_SECRET:
             raise ValueError("REDDIT_CLIENT_SECRET is required")
 
+        asyncpraw = lazy_import("asyncpraw")
+
+        # Requests made to Reddit, by client method
+        self.upstream_calls = Counter()
+
+        # Posts already evaluated/replied to, shared by every tool and run
+        self.post_index = ProcessedPostIndex()
+
+        # Write-through store of fetched posts and comments
+        self.snapshots = SnapshotStore()
+
+        # API hosts, plus a requestor recording or replaying traffic (RECORD_MODE)
+        reddit_options = {
+            "oauth_url": settings.REDDIT_OAUTH_URL,
+            "reddit_url": settings.REDDIT_URL,
+        }
+        if settings.RECORD_MODE != "off":
+            recording = lazy_import("app.services.recording")
+            reddit_options.update(recording.reddit_requestor_options())
+
         if settings.REDDIT_USERNAME and settings.REDDIT_PASSWORD:
             self.reddit = asyncpraw.Reddit(
                 client_id=settings.REDDIT_CLIENT_ID,
@@ -28,6 +56,7 @@ class AsyncRedditClient:
                 username=settings.REDDIT_USERNAME,
                 password=settings.REDDIT_PASSWORD,
                 user_agent=settings.USER_AGENT,
+                **reddit_options,
             )
             self.can_post = True
             logger.info(
@@ -39,6 +68,7 @@ class AsyncRedditClient:
                 client_id=settings.REDDIT_CLIENT_ID,
                 client_secret=settings.REDDIT_CLIENT_SECRET,
                 user_agent=settings.USER_AGENT,
+                **reddit_options,
             )
             self.can_post = False
             logger.info("Initialized async client in read-only mode")
@@ -46,20 +76,70 @@ class AsyncRedditClient:
     async def close(self):
         """Close the Reddit session"""
         await self.reddit.close()
+        self.post_index.close()
+        self.snapshots.close()
+
+    async def _snapshot_read(self, method, *args):
+        """
+        Run a snapshot store read in a worker thread
 
-    async def get_top_posts(self, subreddit_name, limit=DEFAULT_POST_LIMIT):
-        """Get top posts from subreddit in last 24 hours"""
+        The store may wait out another worker's write lock (busy_timeout),
+        which must not stall the event loop. A failed read counts as a miss.
+        """
         try:
-            subreddit = await self.reddit.subreddit(subreddit_name)
-            posts = []
-            async for post in subreddit.top(time_filter="day", limit=limit):
-                posts.append(post)
-            logger.info(f"Fetched {len(posts)} posts from r/{subreddit_name}")
-            return posts
+            return await asyncio.to_thread(method, *args)
+        except Exception as e:
+            logger.error(f"Snapshot read {method.__name__} failed: {e}")
+            return None
+
+    async def _snapshot_write(self, method, *args):
+        """Run a snapshot store write in a worker thread; a failure is only logged"""
+        try:
+            await asyncio.to_thread(method, *args)
+        except Exception as e:
+            logger.error(f"Snapshot write {method.__name__} failed: {e}")
+
+    async def ping(self):
+        """Read one post of a small listing, to check Reddit is reachable"""
+        self.upstream_calls["ping"] += 1
+        subreddit = await self.reddit.subreddit(PROBE_SUBREDDIT)
+        async for _ in subreddit.new(limit=1):
+            break
+
+    @traced()
+    async def get_top_posts(self, subreddit_name, limit=DEFAULT_POST_LIMIT, after=None):
+        """
+        Get top posts from subreddit in last 24 hours
+
+        Args:
+            subreddit_name (str): Subreddit to list
+            limit (int): Number of posts
+            after (str): Reddit listing cursor (fullname of the last post of
+                the previous page); only the page after it is fetched
+        """
+        try:
+            async with deadline_scope():
+                self.upstream_calls["get_top_posts"] += 1
+                subreddit = await self.reddit.subreddit(subreddit_name)
+                posts = []
+                params = {"after": after} if after else {}
+                async for post in subreddit.top(
+                    time_filter="day", limit=limit, params=params
+                ):
+                    posts.append(post)
+        except DeadlineExceeded:
+            raise  # not a fetch failure; the caller gives up on the request
         except Exception as e:
             logger.error(f"Failed to fetch posts from r/{subreddit_name}: {e}")
             return []
 
+        await self._snapshot_write(
+            self.snapshots.upsert_posts, [await self.get_post_data(p) for p in posts]
+        )
+        logger.info(f"Fetched {len(posts)} posts from r/{subreddit_name}")
+        return posts
+
+    @traced()
     async def get_post_data(self, post):
         """Extract relevant data from a Reddit post"""
         return {
@@ -72,14 +152,16 @@ class AsyncRedditClient:
             "subreddit": str(post.subreddit),
         }
 
+    @traced()
     async def get_top_comments(self, post, limit=DEFAULT_COMMENT_LIMIT):
-        """Get top x comments from a post"""
+        """Get the top x comments of a post, skipping deleted/removed ones"""
         try:
             await post.comments.replace_more(limit=0)  # Remove "load more comments"
 
             comment_data = []
-            for comment in post.comments[:limit]:
-                # Skip deleted/removed comments
+            for comment in post.comments:
+                if len(comment_data) == limit:
+                    break
                 if hasattr(comment, "body") and comment.body not in DELETED_CONTENT:
                     comment_data.append(
                         {
@@ -93,19 +175,120 @@ class AsyncRedditClient:
                         }
                     )
 
-            logger.info(f"Fetched {len(comment_data)} comments for post {post.id}")
-            return comment_data
-
         except Exception as e:
             logger.error(f"Failed to fetch comments for post {post.id}: {e}")
             return []
 
+        await self._snapshot_write(
+            self.snapshots.upsert_comments, post.id, comment_data, limit
+        )
+        logger.info(f"Fetched {len(comment_data)} comments for post {post.id}")
+        return comment_data
+
+    @traced()
     async def get_post_with_comments(self, post, comment_limit=DEFAULT_COMMENT_LIMIT):
         """Get post data along with its top comments"""
         post_data = await self.get_post_data(post)
         post_data["comments"] = await self.get_top_comments(post, comment_limit)
         return post_data
 
+    @traced()
+    async def get_post_with_comments_by_id(
+        self, post_id, comment_limit=DEFAULT_COMMENT_LIMIT
+    ):
+        """
+        Get post data with its top comments, from the snapshot store if recent
+
+        A post whose comments were fetched within SNAPSHOT_MAX_AGE, with at
+        least `comment_limit` requested, is served locally; once its metrics
+        are older than SNAPSHOT_METRICS_MAX_AGE only score/num_comments are
+        refreshed. Otherwise the submission is loaded.
+        """
+        snapshot = await self._snapshot_read(self.snapshots.get_post, post_id)
+        now = time.time()
+        if (
+            snapshot
+            and snapshot["comments_fetched_at"]
+            and now - snapshot["comments_fetched_at"] < settings.SNAPSHOT_MAX_AGE
+            and (snapshot["comments_limit"] or 0) >= comment_limit
+        ):
+            if now - snapshot["refreshed_at"] > settings.SNAPSHOT_METRICS_MAX_AGE:
+                await self.refresh_post_metrics([post_id])
+                snapshot = (
+                    await self._snapshot_read(self.snapshots.get_post, post_id)
+                    or snapshot
+                )
+
+            comments = await self._snapshot_read(
+                self.snapshots.get_comments, post_id, comment_limit
+            )
+            if comments is not None:
+                post_data = {field: snapshot[field] for field in POST_FIELDS}
+                post_data["comments"] = comments
+                return post_data
+
+        post = await self.get_submission_by_id(post_id)
+        return await self.get_post_with_comments(post, comment_limit)
+
+    @traced()
+    async def get_post_data_by_id(self, post_id):
+        """
+        Get post data without its comments, from the snapshot store if recent
+
+        Otherwise the submission alone is read through the info endpoint,
+        which, unlike loading it, does not return the comment forest.
+        """
+        snapshot = await self._snapshot_read(self.snapshots.get_post, post_id)
+        now = time.time()
+        if snapshot and now - snapshot["fetched_at"] < settings.SNAPSHOT_MAX_AGE:
+            if now - snapshot["refreshed_at"] > settings.SNAPSHOT_METRICS_MAX_AGE:
+                await self.refresh_post_metrics([post_id])
+                snapshot = (
+                    await self._snapshot_read(self.snapshots.get_post, post_id)
+                    or snapshot
+                )
+            return {field: snapshot[field] for field in POST_FIELDS}
+
+        try:
+            async with deadline_scope():
+                self.upstream_calls["get_post_data_by_id"] += 1
+                submissions = [
+                    submission
+                    async for submission in self.reddit.info(
+                        fullnames=[f"t3_{post_id}"]
+                    )
+                ]
+        except Exception as e:
+            logger.error(f"Failed to get submission {post_id}: {e}")
+            raise
+        if not submissions:
+            raise ValueError(f"Post {post_id} not found")
+
+        post_data = await self.get_post_data(submissions[0])
+        await self._snapshot_write(self.snapshots.upsert_posts, [post_data])
+        return post_data
+
+    @traced()
+    async def refresh_post_metrics(self, post_ids):
+        """Update score/num_comments of stored posts in one batched request"""
+        try:
+            async with deadline_scope():
+                self.upstream_calls["refresh_post_metrics"] += 1
+                fullnames = [f"t3_{post_id}" for post_id in post_ids]
+                metrics = []
+                async for submission in self.reddit.info(fullnames=fullnames):
+                    metrics.append(
+                        (submission.id, submission.score, submission.num_comments)
+                    )
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # Stale metrics are still better than failing the read
+            logger.error(f"Failed to refresh metrics for {len(post_ids)} posts: {e}")
+            return
+        await self._snapshot_write(self.snapshots.update_metrics, metrics)
+
+    @traced()
     async def analyze_subreddit(
         self,
         subreddit_name,
@@ -123,6 +306,7 @@ class AsyncRedditClient:
         logger.info(f"Analyzed {len(analyzed_posts)} posts from r/{subreddit_name}")
         return analyzed_posts
 
+    @traced()
     async def post_comment(self, post_id, comment_text, dry_run=DEFAULT_DRY_RUN):
         """
         Post a comment to a Reddit submission
@@ -151,6 +335,8 @@ class AsyncRedditClient:
                 "message": "Dry run completed successfully",
             }
 
+        claimed = False
+        comment = None
         try:
             # Get the submission
             submission = await self.reddit.submission(id=post_id)
@@ -164,8 +350,28 @@ class AsyncRedditClient:
                     f"Comment text too long (max {MAX_COMMENT_LENGTH:,} characters)"
                 )
 
-            # Post the comment
+            # At most one reply per post, across runs and tools
+            claimed = await asyncio.to_thread(self.post_index.claim_reply, post_id)
+            if not claimed:
+                logger.warning(f"Already replied to post {post_id}, not posting again")
+                return {
+                    "success": False,
+                    "error": f"Already replied to post {post_id}",
+                    "error_type": "duplicate",
+                }
+
+            # Post the comment. Deliberately not bound by the request
+            # deadline: a reply cut off mid-flight may still land on Reddit
+            # without being recorded here.
+            self.upstream_calls["post_comment"] += 1
             comment = await submission.reply(comment_text)
+            try:
+                await asyncio.to_thread(
+                    self.post_index.set_comment_id, post_id, comment.id
+                )
+            except Exception as e:
+                # The comment is live; only the bookkeeping is missing
+                logger.error(f"Failed to record comment {comment.id} of {post_id}: {e}")
 
             logger.info(f"Successfully posted comment {comment.id} to post {post_id}")
             return {
@@ -176,16 +382,25 @@ class AsyncRedditClient:
             }
 
         except Exception as e:
+            if claimed and comment is None:
+                # Nothing was posted, so a later run may try again
+                await asyncio.to_thread(self.post_index.release_reply, post_id)
             error_msg = f"Failed to post comment: {e}"
             logger.error(error_msg)
             return {"success": False, "error": error_msg, "error_type": "error"}
 
+    @traced()
     async def get_submission_by_id(self, post_id):
         """Get a submission by its ID"""
         try:
-            submission = await self.reddit.submission(id=post_id)
-            await submission.load()  # Load the submission data
-            return submission
+            async with deadline_scope():
+                self.upstream_calls["get_submission_by_id"] += 1
+                submission = await self.reddit.submission(id=post_id)
+                await submission.load()  # Load the submission data
         except Exception as e:
             logger.error(f"Failed to get submission {post_id}: {e}")
             raise
+        await self._snapshot_write(
+            self.snapshots.upsert_posts, [await self.get_post_data(submission)]
+        )
+        return submission
@@ -0,0 +1,189 @@
+"""
+History of generated comments
+
+Every successful generation is stored in SQLite with its post, tone, model,
+prompt hash, token usage, latency and whether it was posted. Comment text is
+indexed with FTS5, and listing uses keyset pagination on the row id, so
+filtered searches stay in the millisecond range over hundreds of thousands of
+rows.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id            INTEGER PRIMARY KEY,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    post_id       TEXT NOT NULL,
+    subreddit     TEXT,
+    tone          TEXT NOT NULL,
+    model         TEXT,
+    prompt_hash   TEXT,
+    input_tokens  INTEGER,
+    output_tokens INTEGER,
+    latency_ms    REAL,
+    posted        INTEGER NOT NULL DEFAULT 0,
+    text          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_generations_post ON generations (post_id, id);
+CREATE INDEX IF NOT EXISTS idx_generations_subreddit ON generations (subreddit, id);
+CREATE INDEX IF NOT EXISTS idx_generations_tone ON generations (tone, id);
+CREATE INDEX IF NOT EXISTS idx_generations_posted ON generations (posted, id);
+CREATE INDEX IF NOT EXISTS idx_generations_updated ON generations (updated_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(
+    text, content='generations', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS generations_ai AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS generations_ad AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts (generations_fts, rowid, text)
+    VALUES ('delete', old.id, old.text);
+END;
+"""
+
+COLUMNS = (
+    "id",
+    "created_at",
+    "post_id",
+    "subreddit",
+    "tone",
+    "model",
+    "prompt_hash",
+    "input_tokens",
+    "output_tokens",
+    "latency_ms",
+    "posted",
+    "text",
+)
+
+# Filters accepted by `query`, mapped to their SQL condition
+FILTERS = {
+    "post_id": "g.post_id = ?",
+    "subreddit": "g.subreddit = ? COLLATE NOCASE",
+    "tone": "g.tone = ?",
+    "model": "g.model = ?",
+    "posted": "g.posted = ?",
+    "since": "g.created_at >= ?",
+    "until": "g.created_at < ?",
+}
+
+MAX_PAGE_SIZE = 200
+
+
+class GenerationStore:
+    def __init__(self, path=None):
+        self.path = path or settings.GENERATIONS_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, post_data, result):
+        """Store a successful generation; returns its id"""
+        usage = result.get("usage") or {}
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO generations (created_at, updated_at, post_id, subreddit,
+                    tone, model, prompt_hash, input_tokens, output_tokens,
+                    latency_ms, text)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    now,
+                    now,
+                    post_data["id"],
+                    post_data.get("subreddit"),
+                    result["tone"],
+                    result.get("model"),
+                    result.get("prompt_hash"),
+                    usage.get("input_tokens"),
+                    usage.get("output_tokens"),
+                    result.get("latency_ms"),
+                    result["comment"],
+                ),
+            )
+        return cursor.lastrowid
+
+    def mark_posted(self, generation_id=None, post_id=None, text=None):
+        """
+        Flag a generation as posted, by id or by (post_id, text)
+
+        Returns:
+            bool: True if a generation was updated
+        """
+        if generation_id is not None:
+            where, params = "id = ?", (generation_id,)
+        else:
+            # Latest generation of this post with exactly this text
+            where = (
+                "id = (SELECT MAX(id) FROM generations WHERE post_id = ? AND text = ?)"
+            )
+            params = (post_id, text)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE generations SET posted = 1, updated_at = ? WHERE {where}",
+                (time.time(), *params),
+            )
+        return cursor.rowcount > 0
+
+    def query(self, search=None, before_id=None, limit=50, **filters):
+        """
+        Newest-first page of generations
+
+        Args:
+            search (str): FTS5 query over the comment text
+            before_id (int): Cursor; only rows with a smaller id are returned
+            limit (int): Page size (capped at MAX_PAGE_SIZE)
+            **filters: Any of FILTERS; None values are ignored
+
+        Returns:
+            tuple: (rows, next_cursor) where next_cursor is None on the last page
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        source, key, conditions, params = "generations g", "g.id", [], []
+        if search:
+            # Walk the FTS index newest first and look rows up by id, so a
+            # common term stops after one page instead of sorting every match
+            source = "generations_fts f CROSS JOIN generations g ON g.id = f.rowid"
+            key = "f.rowid"
+            conditions.append("generations_fts MATCH ?")
+            params.append(search)
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter: {name}")
+            conditions.append(FILTERS[name])
+            params.append(int(value) if name == "posted" else value)
+        if before_id is not None:
+            conditions.append(f"{key} < ?")
+            params.append(before_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = ", ".join(f"g.{column}" for column in COLUMNS)
+        sql = f"SELECT {columns} FROM {source} {where} ORDER BY {key} DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit + 1)).fetchall()
+
+        rows = [dict(row) for row in rows]
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_cursor
@@ -0,0 +1,105 @@
+"""
+Background upstream health probes
+
+A HealthMonitor runs every probe (a coroutine function reaching one
+upstream) each HEALTH_PROBE_INTERVAL seconds and keeps the last outcome and
+latency. Readiness checks read those cached results, so however often an
+orchestrator polls /readyz, upstream traffic stays at one probe per
+interval per worker.
+"""
+
+import asyncio
+import contextvars
+import time
+
+from app.core.config import settings
+from app.core.logger import init_logger
+
+logger = init_logger(__name__)
+
+# A result older than this many intervals means the probe loop is stuck
+STALE_AFTER_INTERVALS = 3
+
+
+class ProbeResult:
+    def __init__(self, ok, latency_ms, error=None):
+        self.ok = ok
+        self.latency_ms = latency_ms
+        self.error = error
+        self.checked_at = time.time()
+
+    def as_dict(self):
+        return {
+            "ok": self.ok,
+            "latency_ms": round(self.latency_ms, 1),
+            "error": self.error,
+            "checked_at": self.checked_at,
+        }
+
+
+class HealthMonitor:
+    """Probes upstreams on an interval and caches their status"""
+
+    def __init__(self, probes, interval=None, timeout=None):
+        self.probes = probes  # name -> async callable
+        self.interval = interval or settings.HEALTH_PROBE_INTERVAL
+        self.timeout = timeout or settings.HEALTH_PROBE_TIMEOUT
+        self.results = {}  # name -> ProbeResult
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            # Fresh context: the loop must not carry a request id or trace
+            self.task = asyncio.create_task(
+                self._run(), name="health probes", context=contextvars.Context()
+            )
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        await asyncio.gather(*(self.probe(name) for name in self.probes))
+
+    async def probe(self, name):
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self.probes[name]()
+            result = ProbeResult(True, (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            result = ProbeResult(False, (time.perf_counter() - start) * 1000, error)
+
+        previous = self.results.get(name)
+        if previous is None or previous.ok != result.ok:
+            log = logger.info if result.ok else logger.warning
+            log(f"Health probe {name}: {'ok' if result.ok else result.error}")
+        self.results[name] = result
+        return result
+
+    def status(self):
+        """Cached probe results; ready only if every probe passed recently"""
+        stale_before = time.time() - self.interval * STALE_AFTER_INTERVALS
+        checks = {}
+        ready = True
+        for name in self.probes:
+            result = self.results.get(name)
+            if result is None:
+                checks[name] = {"ok": False, "error": "not probed yet"}
+                ready = False
+                continue
+            checks[name] = result.as_dict()
+            if not result.ok:
+                ready = False
+            elif result.checked_at < stale_before:
+                checks[name].update(ok=False, error="result is stale")
+                ready = False
+        return {"status": "ready" if ready else "not_ready", "checks": checks}
@@ -0,0 +1,160 @@
+"""
+Shared live listing pollers
+
+One background task per subscribed subreddit polls Reddit and pushes only the
+changes (new posts, score and comment-count updates, removed posts) to every
+subscriber, so upstream traffic grows with the number of distinct subreddits
+rather than the number of open clients. A poller stops when its last
+subscriber leaves.
+"""
+
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.core.logger import init_logger
+
+logger = init_logger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+METRIC_FIELDS = ("score", "num_comments")
+
+
+def diff_listings(previous, current):
+    """
+    Changes between two listings ({id: summary})
+
+    Returns:
+        dict: added summaries, updated metrics and removed ids, or None if
+        nothing changed
+    """
+    added = [post for post_id, post in current.items() if post_id not in previous]
+    removed = [post_id for post_id in previous if post_id not in current]
+    updated = []
+    for post_id, post in current.items():
+        old = previous.get(post_id)
+        if old and any(old[field] != post[field] for field in METRIC_FIELDS):
+            updated.append({"id": post_id, **{f: post[f] for f in METRIC_FIELDS}})
+
+    if not (added or removed or updated):
+        return None
+    return {"added": added, "updated": updated, "removed": removed}
+
+
+class ListingPoller:
+    """Polls one subreddit and fans the diffs out to its subscribers"""
+
+    def __init__(self, subreddit, get_reddit_client):
+        self.subreddit = subreddit
+        self.get_reddit_client = get_reddit_client
+        self.subscribers = set()
+        self.listing = None  # {id: summary} of the last successful poll
+        self.task = None
+
+    def start(self):
+        # Fresh context: the poller outlives the request that started it, so
+        # it must not inherit that request's id or trace
+        self.task = asyncio.create_task(
+            self._run(),
+            name=f"poll r/{self.subreddit}",
+            context=contextvars.Context(),
+        )
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def snapshot_event(self):
+        return {"type": "snapshot", "posts": list(self.listing.values())}
+
+    def publish(self, event):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and resync with a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot_event())
+
+    async def poll_once(self):
+        reddit_client = await self.get_reddit_client()
+        posts = await reddit_client.get_top_posts(
+            self.subreddit, limit=settings.LIVE_LISTING_LIMIT
+        )
+        if not posts:
+            # get_top_posts returns [] on errors; don't report everything removed
+            logger.warning(f"Live poll of r/{self.subreddit} returned no posts")
+            return
+
+        current = {}
+        for post in posts:
+            post_data = await reddit_client.get_post_data(post)
+            current[post_data["id"]] = {
+                "id": post_data["id"],
+                "title": post_data["title"],
+                "score": post_data["score"],
+                "num_comments": post_data["num_comments"],
+                "subreddit": post_data["subreddit"],
+            }
+
+        if self.listing is None:
+            self.listing = current
+            self.publish(self.snapshot_event())
+            return
+
+        changes = diff_listings(self.listing, current)
+        self.listing = current
+        if changes:
+            self.publish({"type": "diff", **changes})
+
+    async def _run(self):
+        logger.info(f"Started live poller for r/{self.subreddit}")
+        try:
+            while True:
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    logger.error(f"Live poll of r/{self.subreddit} failed: {e}")
+                await asyncio.sleep(settings.LIVE_POLL_INTERVAL)
+        finally:
+            logger.info(f"Stopped live poller for r/{self.subreddit}")
+
+
+class ListingHub:
+    """Registry of live pollers, one per subscribed subreddit"""
+
+    def __init__(self, get_reddit_client):
+        self.get_reddit_client = get_reddit_client
+        self.pollers = {}
+
+    @asynccontextmanager
+    async def subscribe(self, subreddit):
+        """Yield a queue of listing events for `subreddit` while subscribed"""
+        key = subreddit.lower()
+        poller = self.pollers.get(key)
+        if poller is None:
+            poller = self.pollers[key] = ListingPoller(
+                subreddit, self.get_reddit_client
+            )
+            poller.start()
+
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if poller.listing is not None:
+            queue.put_nowait(poller.snapshot_event())
+        poller.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            poller.subscribers.discard(queue)
+            if not poller.subscribers and self.pollers.get(key) is poller:
+                del self.pollers[key]
+                await poller.stop()
+
+    async def close(self):
+        pollers, self.pollers = list(self.pollers.values()), {}
+        for poller in pollers:
+            await poller.stop()
@@ -1,17 +1,21 @@
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import hashlib
+import time
+from collections import Counter
 
 from app.core.config import settings
 from app.core.constants import (
     DEFAULT_TEMPERATURE,
-    DELETED_CONTENT,
+    GEMINI_API_VERSION,
     MAX_LLM_TOKENS,
     MIN_COMMENT_LENGTH,
-    MIN_POST_COMMENTS,
-    MIN_POST_SCORE,
-    MIN_TITLE_LENGTH,
 )
+from app.core.deadline import DeadlineExceeded, deadline_scope
 from app.core.logger import init_logger
+from app.core.startup import lazy_import
+from app.core.tracing import span, traced
+from app.services.generation_store import GenerationStore
+from app.services.post_filter import SUITABLE_REASON, PostFilter
 from app.services.prompts import AUTO_SELECT_USER, COMMENT_GENERATION_USER, TONE_PROMPTS
 
 logger = init_logger(__name__)
@@ -22,28 +26,75 @@ class LLMClient:
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY is required")
 
-        self.llm = ChatGoogleGenerativeAI(
+        # The chat model (and LangChain) is only loaded when first needed;
+        # tones and relevance checks work without it
+        self._llm = None
+
+        # Requests made to Gemini, by client method
+        self.upstream_calls = Counter()
+
+        # Every successful generation, for review and audit
+        self.generations = GenerationStore()
+
+        # Suitability rules (batched use: PostFilter.evaluate)
+        self.post_filter = PostFilter()
+
+    def close(self):
+        self.generations.close()
+
+    async def ping(self):
+        """
+        Check Gemini is reachable and the key valid, without generating
+
+        Reads the configured model's metadata. Nothing is sent when
+        completions are replayed.
+        """
+        if settings.RECORD_MODE == "replay":
+            return
+        self.upstream_calls["ping"] += 1
+        httpx = lazy_import("httpx")
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{settings.GEMINI_BASE_URL}/{GEMINI_API_VERSION}"
+                f"/models/{settings.GEMINI_MODEL}",
+                headers={"x-goog-api-key": settings.GEMINI_API_KEY},
+            )
+        response.raise_for_status()
+
+    @property
+    def llm(self):
+        """Gemini chat model, created on first use"""
+        if self._llm is None:
+            if settings.RECORD_MODE != "off":
+                # Record or replay completions (RECORD_MODE)
+                recording = lazy_import("app.services.recording")
+                self._llm = recording.wrap_llm(self._create_llm)
+            else:
+                self._llm = self._create_llm()
+        return self._llm
+
+    def _create_llm(self):
+        genai = lazy_import("langchain_google_genai")
+        llm = genai.ChatGoogleGenerativeAI(
             model=settings.GEMINI_MODEL,
             google_api_key=settings.GEMINI_API_KEY,
+            base_url=settings.GEMINI_BASE_URL,
             temperature=DEFAULT_TEMPERATURE,
             max_tokens=MAX_LLM_TOKENS,
         )
         logger.info(
             f"Initialized Gemini LLM client with model: {settings.GEMINI_MODEL}"
         )
+        return llm
 
+    @traced()
     def get_available_tones(self):
         """Get list of available comment tones"""
         return list(TONE_PROMPTS.keys())
 
-    def generate_comment(self, post_data, existing_comments=None, tone="auto"):
-        """Generate a contextual comment for a Reddit post with specified tone"""
-
-        # Validate tone
-        if tone not in TONE_PROMPTS:
-            logger.warning(f"Unknown tone '{tone}', defaulting to 'auto'")
-            tone = "auto"
-
+    @traced()
+    def build_prompt(self, post_data, existing_comments, tone):
+        """Build the user prompt for a post, its top comments and a tone"""
         # Format comments section
         comments_section = ""
         if existing_comments:
@@ -74,48 +125,82 @@ class LLMClient:
                 comments_section=comments_section,
             )
 
+        return user_prompt
+
+    @traced()
+    async def generate_comment(self, post_data, existing_comments=None, tone="auto"):
+        """
+        Generate a contextual comment for a Reddit post with specified tone
+
+        The Gemini call is bound by the current deadline and is cancelled with
+        the caller, so an abandoned request stops waiting on (and paying for)
+        the generation.
+        """
+
+        # Validate tone
+        if tone not in TONE_PROMPTS:
+            logger.warning(f"Unknown tone '{tone}', defaulting to 'auto'")
+            tone = "auto"
+
+        user_prompt = self.build_prompt(post_data, existing_comments, tone)
+        prompt_hash = hashlib.sha256(
+            f"{TONE_PROMPTS[tone]}\n{user_prompt}".encode("utf-8")
+        ).hexdigest()[:32]
+
         try:
+            messages_module = lazy_import("langchain_core.messages")
             messages = [
-                SystemMessage(content=TONE_PROMPTS[tone]),
-                HumanMessage(content=user_prompt),
+                messages_module.SystemMessage(content=TONE_PROMPTS[tone]),
+                messages_module.HumanMessage(content=user_prompt),
             ]
 
-            response = self.llm.invoke(messages)
+            async with deadline_scope():
+                self.upstream_calls["generate_comment"] += 1
+                start = time.perf_counter()
+                with span("llm.invoke", model=settings.GEMINI_MODEL):
+                    response = await self.llm.ainvoke(messages)
+            latency_ms = (time.perf_counter() - start) * 1000
             comment_text = response.content.strip()
 
             # Basic validation
             if len(comment_text) < MIN_COMMENT_LENGTH:
                 raise ValueError("Generated comment too short")
 
-            logger.info(f"Generated {tone} comment: {comment_text}")
-            return {
+            logger.info(f"Generated {tone} comment ({len(comment_text)} chars)")
+            logger.debug(f"Generated comment text: {comment_text}")
+            result = {
                 "success": True,
                 "comment": comment_text,
                 "length": len(comment_text),
                 "tone": tone,
+                "model": settings.GEMINI_MODEL,
+                "prompt_hash": prompt_hash,
+                "latency_ms": round(latency_ms, 1),
+                "usage": getattr(response, "usage_metadata", None) or {},
             }
+            result["generation_id"] = await self.record_generation(post_data, result)
+            return result
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             error_msg = f"Failed to generate {tone} comment: {e}"
             logger.error(error_msg)
             return {"success": False, "error": error_msg, "tone": tone}
 
+    async def record_generation(self, post_data, result):
+        """Store a generation in the history; a store failure never fails it"""
+        try:
+            # A worker thread: the store may wait out another worker's lock
+            return await asyncio.to_thread(self.generations.record, post_data, result)
+        except Exception as e:
+            logger.error(f"Failed to record generation for {post_data['id']}: {e}")
+            return None
+
+    @traced()
     def analyze_post_relevance(self, post_data):
         """Analyze if a post is suitable for commenting"""
-
-        # Skip very low engagement posts
-        if (
-            post_data["score"] < MIN_POST_SCORE
-            and post_data["num_comments"] < MIN_POST_COMMENTS
-        ):
-            return {"suitable": False, "reason": "Low engagement (score/comments)"}
-
-        # Skip deleted/removed content
-        if post_data["content"] in DELETED_CONTENT:
-            return {"suitable": False, "reason": "No content available"}
-
-        # Check title length (avoid very short titles)
-        if len(post_data["title"]) < MIN_TITLE_LENGTH:
-            return {"suitable": False, "reason": "Title too short"}
-
-        return {"suitable": True, "reason": "Post appears suitable for commenting"}
+        rule = self.post_filter.check(post_data)
+        if rule is not None:
+            return {"suitable": False, "reason": rule.reason, "rule": rule.name}
+        return {"suitable": True, "reason": SUITABLE_REASON}
@@ -0,0 +1,172 @@
+"""
+Post suitability rules
+
+A PostFilter evaluates whole batches of posts against an ordered list of
+rules. Each rule belongs to a stage:
+
+- listing: uses only what a subreddit listing returns (title, score,
+  content, ...), so it runs before any comments are fetched and rejected
+  posts never cost a request
+- comments: needs the loaded comments and runs on the chosen post
+
+A post is rejected by the first rule it fails. FilterStats counts the
+rejections by rule, so a run can report why its candidate pool came back
+empty.
+"""
+
+from collections import Counter
+
+from app.core.constants import (
+    DELETED_CONTENT,
+    MIN_LOADED_COMMENTS,
+    MIN_POST_COMMENTS,
+    MIN_POST_SCORE,
+    MIN_TITLE_LENGTH,
+)
+
+LISTING = "listing"
+COMMENTS = "comments"
+STAGES = (LISTING, COMMENTS)
+
+SUITABLE_REASON = "Post appears suitable for commenting"
+
+
+class Rule:
+    """A named check; `passes(post_data)` is True for suitable posts"""
+
+    def __init__(self, name, reason, passes, stage=LISTING):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown rule stage '{stage}'")
+        self.name = name
+        self.reason = reason
+        self.passes = passes
+        self.stage = stage
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, stage={self.stage!r})"
+
+
+def min_engagement(min_score=MIN_POST_SCORE, min_comments=MIN_POST_COMMENTS):
+    """Either the score or the comment count must reach its minimum"""
+    return Rule(
+        "low_engagement",
+        "Low engagement (score/comments)",
+        lambda post: post["score"] >= min_score or post["num_comments"] >= min_comments,
+    )
+
+
+def has_content(deleted=DELETED_CONTENT):
+    deleted = frozenset(deleted)
+    return Rule(
+        "no_content",
+        "No content available",
+        lambda post: post["content"] not in deleted,
+    )
+
+
+def min_title_length(length=MIN_TITLE_LENGTH):
+    return Rule(
+        "short_title",
+        "Title too short",
+        lambda post: len(post["title"]) >= length,
+    )
+
+
+def min_loaded_comments(count=MIN_LOADED_COMMENTS):
+    """The loaded post must have `count` usable comments to give context"""
+    return Rule(
+        "few_comments",
+        "Too few comments for context",
+        lambda post: len(post["comments"]) >= count,
+        stage=COMMENTS,
+    )
+
+
+def default_rules():
+    """The rules in constants.py; the comment rule only if it is enabled"""
+    rules = [min_engagement(), has_content(), min_title_length()]
+    if MIN_LOADED_COMMENTS > 0:
+        rules.append(min_loaded_comments())
+    return rules
+
+
+class FilterStats:
+    """Outcome counts of the batches a PostFilter evaluated"""
+
+    def __init__(self):
+        self.evaluated = Counter()  # posts, by stage
+        self.accepted = Counter()  # posts, by stage
+        self.rejected = Counter()  # posts, by rule name (or skip reason)
+
+    def count_rejected(self, reason, count=1):
+        """Count posts dropped outside the rules (e.g. already processed)"""
+        if count:
+            self.rejected[reason] += count
+
+    @property
+    def listing_rejected(self):
+        """Posts the listing rules rejected"""
+        return self.evaluated[LISTING] - self.accepted[LISTING]
+
+    def summary(self):
+        rejected = ", ".join(
+            f"{reason}={count}" for reason, count in self.rejected.most_common()
+        )
+        return (
+            f"evaluated {self.evaluated[LISTING]}, "
+            f"accepted {self.accepted[LISTING]} "
+            f"({self.listing_rejected} rejected on listing data); "
+            f"rejections: {rejected or 'none'}"
+        )
+
+
+class PostFilter:
+    """Compiled rule set, evaluated over batches of post dicts"""
+
+    def __init__(self, rules=None):
+        rules = default_rules() if rules is None else list(rules)
+        self.rules = {stage: [r for r in rules if r.stage == stage] for stage in STAGES}
+
+    def evaluate(self, posts_data, stage=LISTING, stats=None):
+        """
+        Split a batch into suitable and rejected posts
+
+        Each rule runs over the posts that passed the rules before it.
+
+        Returns:
+            tuple: (accepted posts, [(rejected post, Rule), ...]), both in
+            input order
+        """
+        indexed = list(enumerate(posts_data))
+        rejected = []
+        for rule in self.rules[stage]:
+            survivors = []
+            for item in indexed:
+                if rule.passes(item[1]):
+                    survivors.append(item)
+                else:
+                    rejected.append((item[0], item[1], rule))
+            indexed = survivors
+
+        if stats is not None:
+            stats.evaluated[stage] += len(posts_data)
+            stats.accepted[stage] += len(indexed)
+            stats.rejected.update(rule.name for _, _, rule in rejected)
+
+        rejected.sort(key=lambda item: item[0])
+        accepted = [post for _, post in indexed]
+        return accepted, [(post, rule) for _, post, rule in rejected]
+
+    def check(self, post_data):
+        """
+        First rule a single post fails, or None if it is suitable
+
+        Comment rules only apply once the post has its comments.
+        """
+        for stage in STAGES:
+            if stage == COMMENTS and "comments" not in post_data:
+                break
+            for rule in self.rules[stage]:
+                if not rule.passes(post_data):
+                    return rule
+        return None
@@ -0,0 +1,127 @@
+"""
+Persistent index of posts the commenter has already handled
+
+A small SQLite table keyed by post id records when each post was evaluated,
+had a comment generated and was replied to. Scheduled runs consult it before
+fetching comments or calling the LLM, and `claim_reply` guarantees at most one
+reply per post even if two runs overlap.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+from app.core.logger import init_logger
+
+logger = init_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_posts (
+    post_id      TEXT PRIMARY KEY,
+    subreddit    TEXT,
+    evaluated_at REAL,
+    generated_at REAL,
+    replied_at   REAL,
+    comment_id   TEXT
+) WITHOUT ROWID;
+"""
+
+# Column updated by each stage
+STAGES = {
+    "evaluated": "evaluated_at",
+    "generated": "generated_at",
+    "replied": "replied_at",
+}
+
+
+class ProcessedPostIndex:
+    def __init__(self, path=None):
+        self.path = path or settings.PROCESSED_INDEX_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def seen(self, post_ids):
+        """Return the subset of `post_ids` already in the index"""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return set()
+
+        placeholders = ",".join("?" * len(post_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT post_id FROM processed_posts WHERE post_id IN ({placeholders})",
+                post_ids,
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def has_replied(self, post_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT replied_at FROM processed_posts WHERE post_id = ?", (post_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def record(self, post_id, stage, subreddit=None):
+        """Record that a post reached `stage` (evaluated, generated or replied)"""
+        column = STAGES[stage]
+        with self._lock:
+            self._conn.execute(
+                f"""
+                INSERT INTO processed_posts (post_id, subreddit, {column})
+                VALUES (?, ?, ?)
+                ON CONFLICT(post_id) DO UPDATE SET
+                    {column} = excluded.{column},
+                    subreddit = COALESCE(excluded.subreddit, subreddit)
+                """,
+                (post_id, subreddit, time.time()),
+            )
+
+    def claim_reply(self, post_id, subreddit=None):
+        """
+        Atomically reserve the single reply slot of a post
+
+        Returns:
+            bool: True if this caller may reply, False if a reply was already
+            claimed (by this or another run)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO processed_posts (post_id, subreddit) VALUES (?, ?)",
+                (post_id, subreddit),
+            )
+            cursor = self._conn.execute(
+                "UPDATE processed_posts SET replied_at = ? "
+                "WHERE post_id = ? AND replied_at IS NULL",
+                (now, post_id),
+            )
+        return cursor.rowcount == 1
+
+    def release_reply(self, post_id):
+        """Give a claimed reply slot back after a failed post"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE processed_posts SET replied_at = NULL, comment_id = NULL "
+                "WHERE post_id = ?",
+                (post_id,),
+            )
+
+    def set_comment_id(self, post_id, comment_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE processed_posts SET comment_id = ? WHERE post_id = ?",
+                (comment_id, post_id),
+            )
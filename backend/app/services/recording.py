@@ -0,0 +1,361 @@
+"""
+Recording and replay of upstream traffic
+
+With RECORD_MODE=record, every Reddit HTTP response and every Gemini
+completion is appended to a fixture file in FIXTURES_DIR together with its
+latency. With RECORD_MODE=replay, the clients are served from those files
+instead of the network, each response after its recorded latency (scaled by
+REPLAY_LATENCY_SCALE), so benchmarks and regression runs see real payload
+shapes and sizes offline.
+
+Fixtures are JSON lines: a header naming the format version and the client,
+then one interaction per line. Request bodies and headers are never stored.
+Response bodies have tokens and the configured credentials removed, and
+Reddit usernames replaced by stable pseudonyms.
+
+This module imports asyncprawcore and is only loaded when RECORD_MODE is set.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlsplit
+
+from asyncprawcore import Requestor
+from multidict import CIMultiDict
+
+from app.core.config import settings
+from app.core.logger import init_logger
+from app.core.startup import lazy_import
+
+logger = init_logger(__name__)
+
+FIXTURE_FORMAT = "auto-commenter-fixtures"
+FIXTURE_VERSION = 1
+
+MODES = ("off", "record", "replay")
+
+
+def record_mode():
+    mode = settings.RECORD_MODE.lower()
+    if mode not in MODES:
+        raise ValueError(f"RECORD_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    return mode
+
+
+# Response headers worth keeping; rate-limit headers are dropped so replays
+# are not throttled by the recording session's quota
+KEPT_HEADERS = ("content-type",)
+
+# JSON keys holding a Reddit username (or account id)
+USERNAME_KEYS = {"author", "author_fullname", "approved_by", "banned_by", "name"}
+SECRET_KEYS = {"access_token", "refresh_token", "id_token"}
+REDACTED = "[redacted]"
+
+
+def pseudonym(username):
+    """Stable stand-in for a username, so threads keep their shape"""
+    if not isinstance(username, str) or username in ("", "[deleted]"):
+        return username
+    return f"user_{hashlib.sha256(username.encode('utf-8')).hexdigest()[:10]}"
+
+
+def _secrets():
+    values = (
+        settings.REDDIT_CLIENT_ID,
+        settings.REDDIT_CLIENT_SECRET,
+        settings.REDDIT_PASSWORD,
+        settings.GEMINI_API_KEY,
+    )
+    return [value for value in values if value and len(value) >= 4]
+
+
+def scrub_text(text):
+    """Remove configured credentials and the bot's username from text"""
+    for secret in _secrets():
+        text = text.replace(secret, REDACTED)
+    if settings.REDDIT_USERNAME:
+        text = text.replace(
+            settings.REDDIT_USERNAME, pseudonym(settings.REDDIT_USERNAME)
+        )
+    return text
+
+
+def scrub_json(value):
+    """Copy of a decoded JSON value with tokens and usernames replaced"""
+    if isinstance(value, dict):
+        # "name" is a username only on accounts; elsewhere it is a fullname
+        is_account = "link_karma" in value or "comment_karma" in value
+        scrubbed = {}
+        for key, item in value.items():
+            if key in SECRET_KEYS:
+                scrubbed[key] = REDACTED
+            elif key in USERNAME_KEYS and (key != "name" or is_account):
+                scrubbed[key] = pseudonym(item)
+            else:
+                scrubbed[key] = scrub_json(item)
+        return scrubbed
+    if isinstance(value, list):
+        return [scrub_json(item) for item in value]
+    if isinstance(value, str):
+        return scrub_text(value)
+    return value
+
+
+def scrub_body(body, content_type):
+    text = body.decode("utf-8", errors="replace")
+    if "json" in (content_type or ""):
+        try:
+            return json.dumps(scrub_json(json.loads(text)), separators=(",", ":"))
+        except ValueError:
+            pass
+    return scrub_text(text)
+
+
+class FixtureFile:
+    """A versioned JSONL fixture of one client's upstream interactions"""
+
+    def __init__(self, kind, directory=None):
+        self.kind = kind
+        self.path = os.path.join(directory or settings.FIXTURES_DIR, f"{kind}.jsonl")
+        self._checked = False  # header of an existing file verified
+
+    def _check_header(self, line):
+        header = json.loads(line)
+        if header.get("format") != FIXTURE_FORMAT or header.get("kind") != self.kind:
+            raise ValueError(f"{self.path} is not a {self.kind} fixture")
+        if header.get("version") != FIXTURE_VERSION:
+            raise ValueError(
+                f"{self.path} has fixture version {header.get('version')}, "
+                f"expected {FIXTURE_VERSION}; re-record it"
+            )
+
+    def append(self, interaction):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if not is_new and not self._checked:
+            with open(self.path, encoding="utf-8") as f:
+                self._check_header(f.readline())
+        self._checked = True
+        with open(self.path, "a", encoding="utf-8") as f:
+            if is_new:
+                header = {
+                    "format": FIXTURE_FORMAT,
+                    "version": FIXTURE_VERSION,
+                    "kind": self.kind,
+                    "created_at": time.time(),
+                }
+                f.write(json.dumps(header) + "\n")
+            f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+
+    def load(self):
+        """Recorded interactions grouped by key, in recording order"""
+        interactions = {}
+        with open(self.path, encoding="utf-8") as f:
+            self._check_header(f.readline())
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    interactions.setdefault(interaction["key"], []).append(interaction)
+        return interactions
+
+
+class Replayer:
+    """Serves recorded interactions by key, cycling through repeats"""
+
+    def __init__(self, fixture):
+        self.fixture = fixture
+        self.interactions = fixture.load()
+        self._next = {}
+        count = sum(len(items) for items in self.interactions.values())
+        logger.info(f"Loaded {count} recorded interactions from {fixture.path}")
+
+    def lookup(self, key):
+        items = self.interactions.get(key)
+        if not items:
+            return None
+        index = self._next.get(key, 0)
+        self._next[key] = index + 1
+        return items[index % len(items)]
+
+    async def wait(self, interaction):
+        delay = interaction["latency_ms"] / 1000 * settings.REPLAY_LATENCY_SCALE
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Reddit
+
+
+def request_key(method, url, params):
+    """Method, URL and sorted query parameters identifying a Reddit request"""
+    parts = urlsplit(url)
+    query = sorted(
+        parse_qsl(parts.query) + [(k, str(v)) for k, v in (params or {}).items()]
+    )
+    query_string = "&".join(f"{k}={v}" for k, v in query)
+    return (
+        f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}?{query_string}"
+    )
+
+
+def _request_args(args, kwargs):
+    method = args[0] if args else kwargs["method"]
+    url = args[1] if len(args) > 1 else kwargs["url"]
+    return method, url, kwargs.get("params")
+
+
+class RecordingRequestor(Requestor):
+    """asyncprawcore requestor that records every response it receives"""
+
+    def __init__(self, *args, fixture=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fixture = fixture or FixtureFile("reddit")
+
+    @asynccontextmanager
+    async def request(self, *args, **kwargs):
+        method, url, params = _request_args(args, kwargs)
+        start = time.perf_counter()
+        async with super().request(*args, **kwargs) as response:
+            body = await response.read()  # cached; callers can still .json()
+            latency_ms = (time.perf_counter() - start) * 1000
+            content_type = response.headers.get("content-type", "")
+            self.fixture.append(
+                {
+                    "key": request_key(method, url, params),
+                    "status": response.status,
+                    "headers": {
+                        name: response.headers[name]
+                        for name in KEPT_HEADERS
+                        if name in response.headers
+                    },
+                    "body": scrub_body(body, content_type),
+                    "latency_ms": round(latency_ms, 1),
+                    "size": len(body),
+                }
+            )
+            yield response
+
+
+class ReplayResponse:
+    """The subset of aiohttp.ClientResponse asyncprawcore uses"""
+
+    def __init__(self, interaction):
+        self.status = interaction["status"]
+        self._body = interaction["body"].encode("utf-8")
+        self.headers = CIMultiDict(interaction["headers"])
+        self.headers["content-length"] = str(len(self._body))
+
+    async def read(self):
+        return self._body
+
+    async def text(self):
+        return self._body.decode("utf-8")
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+class ReplayRequestor(Requestor):
+    """asyncprawcore requestor serving recorded responses, never the network"""
+
+    def __init__(self, *args, fixture=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replayer = Replayer(fixture or FixtureFile("reddit"))
+
+    async def _ensure_session(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def request(self, *args, **kwargs):
+        method, url, params = _request_args(args, kwargs)
+        key = request_key(method, url, params)
+        interaction = self.replayer.lookup(key)
+        if interaction is None:
+            raise LookupError(f"No recorded Reddit response for {key}")
+        await self.replayer.wait(interaction)
+        yield ReplayResponse(interaction)
+
+
+def reddit_requestor_options():
+    """asyncpraw.Reddit keyword arguments for the configured RECORD_MODE"""
+    if record_mode() == "record":
+        return {"requestor_class": RecordingRequestor}
+    if record_mode() == "replay":
+        return {"requestor_class": ReplayRequestor}
+    return {}
+
+
+# Gemini
+
+
+def messages_key(messages):
+    text = "\n".join(f"{message.type}:{message.content}" for message in messages)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class RecordingLLM:
+    """Wraps the chat model and records each completion"""
+
+    def __init__(self, llm, fixture=None):
+        self.llm = llm
+        self.fixture = fixture or FixtureFile("llm")
+
+    async def ainvoke(self, messages, **kwargs):
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(messages, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.fixture.append(
+            {
+                "key": messages_key(messages),
+                "content": scrub_text(response.content),
+                "usage": getattr(response, "usage_metadata", None),
+                "latency_ms": round(latency_ms, 1),
+            }
+        )
+        return response
+
+
+class ReplayLLM:
+    """
+    Chat model stand-in serving recorded completions
+
+    Prompts that were never recorded (a different tone or post) get the
+    recorded completions in turn, so a replayed run always gets an answer.
+    """
+
+    def __init__(self, fixture=None):
+        self.replayer = Replayer(fixture or FixtureFile("llm"))
+        self._all = [i for items in self.replayer.interactions.values() for i in items]
+        self._fallback = 0
+        if not self._all:
+            raise ValueError(
+                f"{self.replayer.fixture.path} has no recorded completions"
+            )
+
+    async def ainvoke(self, messages, **kwargs):
+        interaction = self.replayer.lookup(messages_key(messages))
+        if interaction is None:
+            interaction = self._all[self._fallback % len(self._all)]
+            self._fallback += 1
+        await self.replayer.wait(interaction)
+        messages_module = lazy_import("langchain_core.messages")
+        return messages_module.AIMessage(
+            content=interaction["content"],
+            usage_metadata=interaction["usage"],
+        )
+
+
+def wrap_llm(create_llm):
+    """Chat model for the configured RECORD_MODE; `create_llm` builds the real one"""
+    if record_mode() == "replay":
+        return ReplayLLM()
+    if record_mode() == "record":
+        return RecordingLLM(create_llm())
+    return create_llm()
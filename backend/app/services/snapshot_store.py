@@ -0,0 +1,159 @@
+"""
+Local snapshot store for Reddit posts and their top comments
+
+AsyncRedditClient writes through to a SQLite database (WAL mode) keyed by
+post/comment id. Bodies are written once; later writes for a known id only
+refresh the mutable metrics (score, num_comments), so recently seen posts can
+be served from disk and refreshed cheaply.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id                  TEXT PRIMARY KEY,
+    subreddit           TEXT NOT NULL,
+    title               TEXT NOT NULL,
+    content             TEXT NOT NULL,
+    url                 TEXT NOT NULL,
+    score               INTEGER NOT NULL,
+    num_comments        INTEGER NOT NULL,
+    fetched_at          REAL NOT NULL,  -- body first downloaded
+    refreshed_at        REAL NOT NULL,  -- metrics last updated
+    comments_fetched_at REAL,           -- top comments last downloaded
+    comments_limit      INTEGER         -- how many top comments were requested
+);
+CREATE INDEX IF NOT EXISTS idx_posts_refreshed ON posts (refreshed_at);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id           TEXT PRIMARY KEY,
+    post_id      TEXT NOT NULL,
+    body         TEXT NOT NULL,
+    score        INTEGER NOT NULL,
+    author       TEXT NOT NULL,
+    created_utc  REAL NOT NULL,
+    rank         INTEGER NOT NULL,
+    fetched_at   REAL NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id, rank);
+CREATE INDEX IF NOT EXISTS idx_comments_refreshed ON comments (refreshed_at);
+"""
+
+POST_FIELDS = ("id", "title", "content", "url", "score", "num_comments", "subreddit")
+COMMENT_FIELDS = ("id", "body", "score", "author", "created_utc")
+
+
+class SnapshotStore:
+    def __init__(self, path=None):
+        self.path = path or settings.SNAPSHOT_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # no fsync per commit in WAL
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = {
+            row["name"] for row in self._conn.execute("PRAGMA table_info(posts)")
+        }
+        if "comments_limit" not in columns:
+            self._conn.execute("ALTER TABLE posts ADD COLUMN comments_limit INTEGER")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def upsert_posts(self, posts_data):
+        """Insert new posts; for known posts only refresh score/num_comments"""
+        now = time.time()
+        rows = [
+            (*(post[field] for field in POST_FIELDS), now, now) for post in posts_data
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO posts (id, title, content, url, score, num_comments,
+                                   subreddit, fetched_at, refreshed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    score = excluded.score,
+                    num_comments = excluded.num_comments,
+                    refreshed_at = excluded.refreshed_at
+                """,
+                rows,
+            )
+
+    def update_metrics(self, metrics):
+        """Refresh (id, score, num_comments) tuples of already known posts"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE posts SET score = ?, num_comments = ?, refreshed_at = ? "
+                "WHERE id = ?",
+                [(score, num, now, post_id) for post_id, score, num in metrics],
+            )
+
+    def upsert_comments(self, post_id, comments_data, limit=None):
+        """
+        Store a post's top comments in rank order; known bodies are kept
+
+        `limit` is how many comments were requested, so later reads for more
+        than that know the stored list may be incomplete.
+        """
+        now = time.time()
+        rows = [
+            (*(comment[field] for field in COMMENT_FIELDS), post_id, rank, now, now)
+            for rank, comment in enumerate(comments_data)
+        ]
+        with self._lock, self._conn:
+            # Comments that dropped out of the top list keep their body but
+            # lose their rank
+            self._conn.execute(
+                "UPDATE comments SET rank = -1 WHERE post_id = ?", (post_id,)
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO comments (id, body, score, author, created_utc,
+                                      post_id, rank, fetched_at, refreshed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    score = excluded.score,
+                    rank = excluded.rank,
+                    refreshed_at = excluded.refreshed_at
+                """,
+                rows,
+            )
+            self._conn.execute(
+                "UPDATE posts SET comments_fetched_at = ?, comments_limit = ? "
+                "WHERE id = ?",
+                (now, limit, post_id),
+            )
+
+    def get_post(self, post_id):
+        """Stored post data plus its fetch timestamps, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM posts WHERE id = ?", (post_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_comments(self, post_id, limit):
+        """Stored top comments of a post, best ranked first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COMMENT_FIELDS)} FROM comments "
+                "WHERE post_id = ? AND rank >= 0 ORDER BY rank LIMIT ?",
+                (post_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
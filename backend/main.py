@@ -1,13 +1,46 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 
+from app.api import routes
+from app.api.http_cache import close_response_cache
 from app.api.routes import router
-from app.core.logger import init_logger
+from app.core.config import settings
+from app.core.logger import init_logger, new_request_id, request_id_var
+from app.core.loop_monitor import loop_monitor
+from app.core.profiling import ProfilingMiddleware
+from app.core.tracing import start_trace
 
 logger = init_logger(__name__)
 
 
-app = FastAPI(title="Reddit Auto Commenter API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app):
+    """Start the background health probes; stop background work at shutdown"""
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    routes.health_monitor.start()
+    try:
+        yield
+    finally:
+        await routes.health_monitor.stop()
+        await loop_monitor.stop()
+        await routes.listing_hub.close()
+        await routes.close_clients()
+        await close_response_cache()
+
+
+app = FastAPI(title="Reddit Auto Commenter API", version="1.0.0", lifespan=lifespan)
+
+# Added first so it is the innermost middleware and profiles cover the handler
+app.add_middleware(ProfilingMiddleware)
+
+# Compresses large bodies (SSE streams are left alone)
+if settings.GZIP_ENABLED:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,8 +48,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # listing and comment pagination
+    expose_headers=["X-Next-Cursor", "Link", "X-Next-Comment-Offset"],
 )
 
+
+class RequestContextMiddleware:
+    """
+    Tag logs with a request id and open the root span of the request trace
+
+    Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware hides
+    the client's http.disconnect from handlers, which deadlines.run_request
+    needs to cancel abandoned work.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("X-Request-ID") or new_request_id()
+        token = request_id_var.set(request_id)
+
+        # Honour B3 headers so callers can force sampling or join an existing trace
+        sampled = headers.get("X-B3-Sampled")
+        try:
+            with start_trace(
+                f"{scope['method']} {scope['path']}",
+                trace_id=headers.get("X-B3-TraceId"),
+                sampled=None if sampled is None else sampled == "1",
+                request_id=request_id,
+            ) as root:
+
+                async def send_with_context(message):
+                    if message["type"] == "http.response.start":
+                        response_headers = MutableHeaders(scope=message)
+                        response_headers["X-Request-ID"] = request_id
+                        if root:
+                            response_headers["X-Trace-Id"] = root.trace_id
+                            root.set_tag("http.status_code", message["status"])
+                    await send(message)
+
+                await self.app(scope, receive, send_with_context)
+        finally:
+            request_id_var.reset(token)
+
+
+# Added last so it is the outermost middleware
+app.add_middleware(RequestContextMiddleware)
+
 # Include routes
 app.include_router(router)
 
@@ -24,4 +108,14 @@ app.include_router(router)
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvicorn cannot reload with several workers
+    reload = settings.API_RELOAD and settings.API_WORKERS == 1
+    if settings.API_RELOAD and not reload:
+        logger.warning("API_RELOAD ignored with API_WORKERS > 1")
+    uvicorn.run(
+        "main:app",
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        reload=reload,
+        workers=settings.API_WORKERS,
+    )